@@ -4,12 +4,17 @@
 # By Chris Herborth (https://github.com/Taffer)
 # MIT license, see LICENSE.md for details.
 
+import os
 import pygame
 import pygame.freetype
 import pygame.gfxdraw
 import time
 import sys
 
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import draw_text, TextInput  # noqa: E402
+
 SCREEN_TITLE = 'Experiment 4 - Text Entry'
 
 SCREEN_WIDTH = 1280  # 720p screen
@@ -31,37 +36,39 @@ class Demo:
         self.dy = 0
         self.dx = 0
 
-        self.text = []  # Completed lines of text.
-        self.cursor = ''  # Incomplete line of text.
-
         self.font = pygame.freetype.Font('resources/LiberationMono-Bold.ttf', 16)
         self.dy = self.font.get_sized_height()
         rect = self.font.get_rect('M')
         self.dx = rect.width
 
-    def draw(self):
-        self.screen.fill(BLACK)
-
         text_x = 100
         text_y = 100
+        self.rect = pygame.Rect(text_x, text_y, self.max_columns * self.dx, self.max_lines * self.dy)
+        self.entry = TextInput(self.rect, self.font, WHITE, BLACK)
 
-        self.font.render_to(self.screen, (10, 10), 'Type to add text.', WHITE)
+        self.drawn = False
+
+    def draw(self):
+        # Only the text entry changes after the first frame, and it only
+        # redraws the lines that need it; returns the Rects that changed.
+        if self.drawn:
+            return self.entry.draw(self.screen)
+
+        self.screen.fill(BLACK)
+
+        draw_text(self.screen, self.font, (10, 10), 'Type to add text; arrows, Home and End move, Shift selects.', WHITE)
 
         # Draw a rectangle around the text area so we can see if we go over.
-        rect = pygame.Rect(text_x, text_y, self.max_columns * self.dx, self.max_lines * self.dy)
-        rect.inflate(self.margin, self.margin)
+        rect = self.rect.inflate(self.margin, self.margin)
         pygame.gfxdraw.rectangle(self.screen, rect, GREEN)
 
-        delta = 0
-        for line in self.text:
-            self.font.render_to(self.screen, (text_x, text_y + delta), line, WHITE)
-            delta += self.dy
+        self.entry.draw(self.screen)
+        self.drawn = True
 
-        if len(self.cursor) > 0:
-            self.font.render_to(self.screen, (text_x, text_y + delta), self.cursor, WHITE)
+        return [self.screen.get_rect()]
 
     def update(self, dt):
-        pass
+        self.entry.update(dt)
 
 
 def main():
@@ -71,6 +78,7 @@ def main():
     pygame.display.set_caption(SCREEN_TITLE)
 
     demo = Demo(screen)
+    pygame.key.start_text_input()  # TEXTINPUT events, including from input methods.
 
     now = time.time()
     dt = 0
@@ -78,8 +86,7 @@ def main():
     playing = True
 
     while playing:
-        demo.draw()
-        pygame.display.flip()
+        pygame.display.update(demo.draw())
 
         dt = time.time() - now
         now = time.time()
@@ -89,20 +96,10 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 playing = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    playing = False
-                elif event.key == pygame.K_RETURN:
-                    # Add moar text.
-                    demo.text.append(demo.cursor)
-                    demo.cursor = ''
-
-                    if len(demo.text) >= demo.max_lines:
-                        demo.text = demo.text[1:]
-                elif event.key < 33 or event.key > 127:
-                    demo.cursor += '?'
-                else:
-                    demo.cursor += chr(event.key)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                playing = False
+            else:
+                demo.entry.handle_event(event)
 
     pygame.quit()
     sys.exit()
@@ -3,12 +3,17 @@
 # By Chris Herborth (https://github.com/Taffer)
 # MIT license, see LICENSE.md for details.
 
+import os
 import pygame
 import pygame.freetype
 import pygame.gfxdraw
 import time
 import sys
 
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import draw_text, TextLog, wrap_text  # noqa: E402
+
 SCREEN_TITLE = 'Experiment 3 - Text Variable'
 
 SCREEN_WIDTH = 1280  # 720p screen
@@ -32,9 +37,8 @@ class Demo:
     def __init__(self, screen):
         self.screen = screen
 
-        self.buff = []
-
         self.max_lines = 5
+        self.buff = TextLog(self.max_lines)  # Scrollback.
         self.max_columns = 20
         self.margin = 2
 
@@ -52,9 +56,6 @@ class Demo:
         rect = self.font.get_rect('M')
         self.dx = rect.width
 
-        rect = self.font.get_rect(' ')
-        self.space_width = rect.width
-
         self.max_width = self.max_columns * self.dx
 
         # HONK is too big at 282x282, so we're actually going to use it at 1/4
@@ -185,41 +186,22 @@ class Demo:
     def draw(self):
         self.screen.fill(BLACK)
 
-        self.font.render_to(self.screen, (10, 10), 'Press [Space] to add text.', WHITE)
+        draw_text(self.screen, self.font, (10, 10), 'Press [Space] to add text, [Up] and [Down] to scroll.', WHITE)
 
         # Draw a rectangle around the text area so we can see if we go over.
         rect = pygame.Rect(self.text_x, self.text_y, self.max_columns * self.dx, self.max_lines * self.dy)
         self.draw_ui(rect)
 
         delta = 0
-        for line in self.buff:
-            self.font.render_to(self.screen, (self.text_x, self.text_y + delta), line, WHITE)
+        for line in self.buff.visible_lines():
+            draw_text(self.screen, self.font, (self.text_x, self.text_y + delta), line, WHITE)
             delta += self.dy
 
     def update(self, dt):
         pass
 
     def add_text(self, line):
-        rect = self.font.get_rect(line)
-        if rect.width <= self.max_width:
-            self.buff.append(line)
-        else:
-            parts = line.split()
-            tmp_str = parts[0]
-            rect = self.font.get_rect(tmp_str)
-            for i in parts[1:]:
-                i_rect = self.font.get_rect(i)
-                if rect.width + self.space_width + i_rect.width < self.max_width:
-                    tmp_str += ' ' + i
-                else:
-                    self.buff.append(tmp_str)
-                    tmp_str = i
-                rect = self.font.get_rect(tmp_str)
-            if len(tmp_str) > 0:
-                self.buff.append(tmp_str)
-
-        while len(self.buff) > self.max_lines:
-            self.buff = self.buff[1:]
+        self.buff.extend(wrap_text(self.font, line, self.max_width))
 
 
 def main():
@@ -252,6 +234,10 @@ def main():
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     playing = False
+                elif event.key == pygame.K_UP:
+                    demo.buff.scroll_by(1)
+                elif event.key == pygame.K_DOWN:
+                    demo.buff.scroll_by(-1)
                 elif event.key == pygame.K_SPACE:
                     # Add moar text.
                     demo.add_text(TEXT[text_idx])
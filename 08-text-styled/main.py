@@ -3,6 +3,7 @@
 # By Chris Herborth (https://github.com/Taffer)
 # MIT license, see LICENSE.md for details.
 
+import os
 import pygame
 import pygame.freetype
 import pygame.gfxdraw
@@ -10,6 +11,10 @@ import random
 import time
 import sys
 
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import draw_text, TextLog  # noqa: E402
+
 SCREEN_TITLE = 'Experiment 8 - Styled Text'
 
 SCREEN_WIDTH = 1280  # 720p screen
@@ -34,25 +39,24 @@ class StyledText:
         self.text = text
         self.font = font
         self.color = color
+        self.width = font.get_rect(text).width  # Measured once.
 
     def get_height(self):
         return self.font.get_sized_height()
 
     def get_width(self):
-        rect = self.font.get_rect(self.text)
-        return rect.width
+        return self.width
 
     def draw(self, surface, x, y):
-        self.font.render_to(surface, (x, y), self.text, self.color)
+        draw_text(surface, self.font, (x, y), self.text, self.color)
 
 
 class Demo:
     def __init__(self, screen):
         self.screen = screen
 
-        self.buff = []
-
         self.max_lines = 5
+        self.buff = TextLog(self.max_lines)  # Lines are pre-rendered Surfaces.
         self.max_columns = 20
         self.margin = 2
 
@@ -78,7 +82,7 @@ class Demo:
     def draw(self):
         self.screen.fill(BLACK)
 
-        self.font.render_to(self.screen, (10, 10), 'Press [Space] to add text.', WHITE)
+        draw_text(self.screen, self.font, (10, 10), 'Press [Space] to add text.', WHITE)
 
         # Draw a rectangle around the text area so we can see if we go over.
         rect = pygame.Rect(self.text_x, self.text_y, self.max_columns * self.dx, self.max_lines * self.dy)
@@ -86,11 +90,8 @@ class Demo:
         pygame.gfxdraw.rectangle(self.screen, rect, GREEN)
 
         delta = 0
-        for line in self.buff:
-            x_delta = 0
-            for w in line:
-                w.draw(self.screen, self.text_x + x_delta, self.text_y + delta)
-                x_delta += w.get_width()
+        for line in self.buff.visible_lines():
+            self.screen.blit(line, (self.text_x, self.text_y + delta))
             delta += self.dy
 
     def update(self, dt):
@@ -115,15 +116,22 @@ class Demo:
                 pieces.append(styled)
                 width += styled_width
             else:
-                self.buff.append(pieces)
+                self.buff.append(self.render_line(pieces))
                 pieces = [styled]
                 width = styled_width
 
         if len(pieces) > 0:
-            self.buff.append(pieces)
+            self.buff.append(self.render_line(pieces))
+
+    def render_line(self, pieces):
+        # Mixed fonts and colours, drawn once into one Surface for the line.
+        line = pygame.Surface((sum(styled.get_width() for styled in pieces), self.dy), pygame.SRCALPHA, 32)
+        x_delta = 0
+        for styled in pieces:
+            styled.draw(line, x_delta, 0)
+            x_delta += styled.get_width()
 
-        while len(self.buff) > self.max_lines:
-            self.buff = self.buff[1:]
+        return line.convert_alpha()
 
 
 def main():
@@ -5,12 +5,12 @@
 
 import os
 import pygame
-import pygame.freetype
 import pygame.gfxdraw
 import sys
-import time
 
-from xml.etree import ElementTree
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import load_font, Map, Minimap, run, trace  # noqa: E402
 
 SCREEN_TITLE = 'Experiment 12 - Minimap Tilemap'
 
@@ -21,64 +21,7 @@ BLACK = pygame.Color('black')
 PURPLE = pygame.Color('purple')
 WHITE = pygame.Color('white')
 
-
-class Map:
-    def __init__(self, map_path):
-        tree = ElementTree.parse(map_path)
-        self.root = tree.getroot()
-        layers = self.root.findall('layer')
-        if len(layers) > 1:
-            raise SystemExit('Map has multiple layers, this experiment only deals with one.')
-
-        # Tileset and image atlas paths are relative to the map file.
-        prefix = os.path.split(map_path)[0]
-
-        tileset = self.root.find('tileset')
-        tileset_path = os.path.join(prefix, tileset.attrib['source'])
-        tileset_tree = ElementTree.parse(tileset_path)
-        tileset_root = tileset_tree.getroot()
-
-        image = tileset_root.find('image')
-        image_path = os.path.join(prefix, image.attrib['source'])
-        self.texture = pygame.image.load(image_path).convert_alpha()
-        texture_rect = self.texture.get_rect()
-
-        # Map size in tiles.
-        self.map_width = int(self.root.attrib['width'])
-        self.map_height = int(self.root.attrib['height'])
-
-        # Tile size in pixels.
-        self.tile_width = int(tileset_root.attrib['tilewidth'])
-        self.tile_height = int(tileset_root.attrib['tileheight'])
-
-        # Create subsurfaces for the tiles in the atlas.
-        self.tiles = [None]  # Index 0 means "don't draw a tile" in Tiled.
-        for y in range(texture_rect.height // self.tile_height):
-            for x in range(texture_rect.width // self.tile_width):
-                tile_rect = pygame.Rect(x * self.tile_width, y * self.tile_height, self.tile_width, self.tile_height)
-                self.tiles.append(self.texture.subsurface(tile_rect))
-
-        # Decode the layer data. This map is using CSV, which is easy; for
-        # help decoding other formats, check out my tileset crusher's code:
-        # https://github.com/Taffer/crushtileset/
-        data = layers[0].find('data').text
-
-        self.layer_data = []
-
-        lines = data.split()
-        for line in lines:
-            for c in line.split(','):
-                if c != '':
-                    self.layer_data.append(int(c))
-
-    def render(self, surface, view_rect):
-        # TODO: How to batch this so it's faster?
-        for y in range(view_rect.height):
-            for x in range(view_rect.width):
-                tile = self.tiles[self.layer_data[x + view_rect.x + (y + view_rect.y) * self.map_width + 1]]
-                target = pygame.Rect(x * self.tile_width, y * self.tile_height, self.tile_width, self.tile_height)
-                if tile is not None:
-                    surface.blit(tile, target)
+MINIMAP_SIZE = 192  # Largest minimap dimension, in pixels.
 
 
 class Demo:
@@ -90,32 +33,31 @@ class Demo:
         self.rect = screen.get_rect()
         self.view_rect = pygame.Rect(0, 0, self.rect.width // self.map.tile_width, self.rect.height // self.map.tile_height)
 
-        self.font = pygame.freetype.Font('resources/fonts/LiberationSerif-Bold.ttf', 16)
-        self.minimap = pygame.image.load('resources/mini-map.png')
+        self.font = load_font('resources/fonts/LiberationSerif-Bold.ttf', 16)
+
+        # Generate the minimap from the map's tiles; each tile is a square
+        # block of pixels, so non-square maps get non-square minimaps.
+        scale = max(1, MINIMAP_SIZE // max(self.map.map_width, self.map.map_height))
+        self.minimap = Minimap(self.map, scale=scale)
 
+    @trace.traced
     def draw(self):
         self.screen.fill(BLACK)
-        self.map.render(self.screen, self.view_rect)
+        self.map.render(self.map.layer_names[0], self.screen, self.view_rect)
         self.font.render_to(self.screen, (10, 10), 'Press arrow keys or WASD.', WHITE)
 
         # Render the minimap.
-        #
-        # The map and minimap are both square, so we only need to keep track of
-        # one delta factor.
-        minimap_rect = self.minimap.get_rect()
+        minimap_rect = self.minimap.surface.get_rect()
         minimap_rect.x = self.screen.get_width() - minimap_rect.width
 
-        self.screen.blit(self.minimap, minimap_rect)
+        self.screen.blit(self.minimap.surface, minimap_rect)
 
-        size_delta = minimap_rect.width / self.map.map_width
-        highlight = pygame.Rect(minimap_rect.x + int(self.view_rect.x * size_delta),
-                                int(self.view_rect.y * size_delta),
-                                int(self.view_rect.width * size_delta),
-                                int(self.view_rect.height * size_delta))
+        highlight = self.minimap.get_view_rect(self.view_rect).move(minimap_rect.x, minimap_rect.y)
         pygame.gfxdraw.rectangle(self.screen, highlight, PURPLE)
 
+    @trace.traced
     def update(self, dt):
-        pass
+        self.map.update(dt)  # Animated tiles.
 
     def view_left(self):
         # Move viewport left.
@@ -141,47 +83,17 @@ class Demo:
         if (self.view_rect.y + self.view_rect.height) > self.map.map_height:
             self.view_rect.y -= 1
 
-
-def main():
-    pygame.init()
-
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption(SCREEN_TITLE)
-
-    demo = Demo(screen)
-
-    now = time.time()
-    dt = 0
-
-    playing = True
-
-    while playing:
-        demo.draw()
-        pygame.display.flip()
-
-        dt = time.time() - now
-        now = time.time()
-
-        demo.update(dt)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                playing = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    playing = False
-                elif event.key in (pygame.K_w, pygame.K_UP):
-                    demo.view_up()
-                elif event.key in (pygame.K_s, pygame.K_DOWN):
-                    demo.view_down()
-                elif event.key in (pygame.K_a, pygame.K_LEFT):
-                    demo.view_left()
-                elif event.key in (pygame.K_d, pygame.K_RIGHT):
-                    demo.view_right()
-
-    pygame.quit()
-    sys.exit()
+    def on_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_w, pygame.K_UP):
+                self.view_up()
+            elif event.key in (pygame.K_s, pygame.K_DOWN):
+                self.view_down()
+            elif event.key in (pygame.K_a, pygame.K_LEFT):
+                self.view_left()
+            elif event.key in (pygame.K_d, pygame.K_RIGHT):
+                self.view_right()
 
 
 if __name__ == '__main__':
-    main()
+    run(Demo, SCREEN_TITLE, SCREEN_WIDTH, SCREEN_HEIGHT)
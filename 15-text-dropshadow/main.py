@@ -3,6 +3,7 @@
 # By Chris Herborth (https://github.com/Taffer)
 # MIT license, see LICENSE.md for details.
 
+import os
 import pygame
 import pygame.freetype
 import pygame.gfxdraw
@@ -10,6 +11,10 @@ import random
 import time
 import sys
 
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import effect_text, glow, OUTLINE, SHADOW_CORNERS  # noqa: E402
+
 SCREEN_TITLE = 'Experiment 15 - Text Dropshadows'
 
 SCREEN_WIDTH = 1280  # 720p screen
@@ -18,6 +23,19 @@ SCREEN_HEIGHT = 720
 BLACK = pygame.Color('black')
 WHITE = pygame.Color('white')
 
+# Text effects are (dx, dy, opacity) copies of the text, in black, under it.
+EFFECTS = [
+    ('Plain white text is hard to read on a light background.', ()),
+    ("Single pixel lower drop-shadow, hopefully it's better.", ((0, 1, 255),)),
+    ("Single pixel lower-right drop-shadow, hopefully it's better.", ((1, 1, 255),)),
+    ("Double pixel lower and lower-right drop-shadow, hopefully it's better.", ((0, 1, 255), (1, 1, 255))),
+    ("Triple pixel lower-left, lower, and lower-right drop-shadow, hopefully it's better.",
+     ((-1, 1, 255), (0, 1, 255), (1, 1, 255))),
+    ('Four drop-shadows, one in each corner, this is the best.', SHADOW_CORNERS),
+    ('Or a full one pixel outline.', OUTLINE),
+    ('Or a soft, three pixel glow.', glow(3)),
+]
+
 
 class Demo:
     def __init__(self, screen):
@@ -41,81 +59,13 @@ class Demo:
         self.screen.fill(BLACK)
         self.screen.blits(self.grass_batch)
 
-        # Variable width font.
+        # Each effect is baked into the text's cached Surface the first time
+        # it's drawn, so every line is one blit.
         y = 10
-        self.font.render_to(self.screen, (10, y), 'Plain white text is hard to read on a light background.', WHITE)
-
-        # Drop-shadow at 0, +1:
-        y += int(self.font_height * 1.5)
-        text = "Single pixel lower drop-shadow, hopefully it's better."
-        self.font.render_to(self.screen, (10, y + 1), text, BLACK)
-        self.font.render_to(self.screen, (10, y), text, WHITE)
-
-        # Drop-shadow at +1, +1:
-        y += int(self.font_height * 1.5)
-        text = "Single pixel lower-right drop-shadow, hopefully it's better."
-        self.font.render_to(self.screen, (10 + 1, y + 1), text, BLACK)
-        self.font.render_to(self.screen, (10, y), text, WHITE)
-
-        # Double drop-shadow at 0, +1 and +1, +1
-        y += int(self.font_height * 1.5)
-        text = "Double pixel lower and lower-right drop-shadow, hopefully it's better."
-        for i in range(2):
-            self.font.render_to(self.screen, (10 + i, y + 1), text, BLACK)
-        self.font.render_to(self.screen, (10, y), text, WHITE)
-
-        # Triple drop-shadow at (-1, +1), (0, +1) and (+1, +1)
-        y += int(self.font_height * 1.5)
-        text = "Triple pixel lower-left, lower, and lower-right drop-shadow, hopefully it's better."
-        for i in range(-1, 2):
-            self.font.render_to(self.screen, (10 + i, y + 1), text, BLACK)
-        self.font.render_to(self.screen, (10, y), text, WHITE)
-
-        # Go nuts, draw at one pixel all around.
-        y += int(self.font_height * 1.5)
-        text = "Four drop-shadows, one in each corner, this is the best."
-        for dy in range(-1, 2, 2):
-            for dx in range(-1, 2, 2):
-                self.font.render_to(self.screen, (10 + dx, y + dy), text, BLACK)
-        self.font.render_to(self.screen, (10, y), text, WHITE)
-
-        # Mono width font.
-        y += int(self.font_height * 1.5)
-        self.mono.render_to(self.screen, (10, y), 'Plain white text is hard to read on a light background.', WHITE)
-
-        # Drop-shadow at 0, +1:
-        y += int(self.font_height * 1.5)
-        text = "Single pixel lower drop-shadow, hopefully it's better."
-        self.mono.render_to(self.screen, (10, y + 1), text, BLACK)
-        self.mono.render_to(self.screen, (10, y), text, WHITE)
-
-        # Drop-shadow at +1, +1:
-        y += int(self.font_height * 1.5)
-        text = "Single pixel lower-right drop-shadow, hopefully it's better."
-        self.mono.render_to(self.screen, (10 + 1, y + 1), text, BLACK)
-        self.mono.render_to(self.screen, (10, y), text, WHITE)
-
-        # Double drop-shadow at 0, +1 and +1, +1
-        y += int(self.font_height * 1.5)
-        text = "Double pixel lower and lower-right drop-shadow, hopefully it's better."
-        for i in range(2):
-            self.mono.render_to(self.screen, (10 + i, y + 1), text, BLACK)
-        self.mono.render_to(self.screen, (10, y), text, WHITE)
-
-        # Triple drop-shadow at (-1, +1), (0, +1) and (+1, +1)
-        y += int(self.font_height * 1.5)
-        text = "Triple pixel lower-left, lower, and lower-right drop-shadow, hopefully it's better."
-        for i in range(-1, 2):
-            self.mono.render_to(self.screen, (10 + i, y + 1), text, BLACK)
-        self.mono.render_to(self.screen, (10, y), text, WHITE)
-
-        # Go nuts, draw at one pixel all around.
-        y += int(self.font_height * 1.5)
-        text = "Four drop-shadows, one in each corner, this is the best."
-        for dy in range(-1, 2, 2):
-            for dx in range(-1, 2, 2):
-                self.mono.render_to(self.screen, (10 + dx, y + dy), text, BLACK)
-        self.mono.render_to(self.screen, (10, y), text, WHITE)
+        for font in (self.font, self.mono):
+            for text, effect in EFFECTS:
+                effect_text(self.screen, font, (10, y), text, effect)
+                y += int(self.font_height * 1.5)
 
     def update(self, dt):
         pass
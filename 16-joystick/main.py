@@ -3,6 +3,7 @@
 # By Chris Herborth (https://github.com/Taffer)
 # MIT license, see LICENSE.md for details.
 
+import os
 import pygame
 import pygame.freetype
 import pygame.gfxdraw
@@ -10,6 +11,10 @@ import random
 import time
 import sys
 
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import BitmapFont  # noqa: E402
+
 SCREEN_TITLE = 'Experiment 16 - How to Joystick'
 
 SCREEN_WIDTH = 1280  # 720p screen
@@ -23,7 +28,8 @@ class Demo:
     def __init__(self, screen):
         self.screen = screen
 
-        self.mono = pygame.freetype.Font('resources/LiberationMono-Bold.ttf', 16)
+        # The readouts change every frame, so draw them from a glyph atlas.
+        self.mono = BitmapFont(pygame.freetype.Font('resources/LiberationMono-Bold.ttf', 16))
 
         self.joystick = None
 
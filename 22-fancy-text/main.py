@@ -3,13 +3,17 @@
 # By Chris Herborth (https://github.com/Taffer)
 # MIT license, see LICENSE.md for details.
 
+import os
 import pygame
 import pygame.freetype
 import pygame.gfxdraw
-import re
 import sys
 import time
 
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import draw_text, RichText  # noqa: E402
+
 SCREEN_TITLE = 'Experiment 22 - Fancy Text'
 
 SCREEN_WIDTH = 1280  # 720p screen
@@ -27,83 +31,26 @@ FORMATTED_TEXT = [
     'Or set {bg=#0000ff}{color=#ff0000}both{/color}{/bg} at once.',
     'Does {color=#00ff00}{bg=#ff00ff}order{/bg}{/color} matter?',
     'Some {s}strong{/s} text and {o}oblique{/o} text!',
+    'Spans can {color=#ffff00}cross {s}several{/s} words{/color}, and {u}{o}nest{/u}{/o} in any order.',
 ]
 
-BG_SETTER = re.compile(r'(.*){bg=(#[A-Fa-f0-9]+)}(.*){/bg}(.*)')
-COLOR_SETTER = re.compile(r'(.*){color=(#[A-Fa-f0-9]+)}(.*){/color}(.*)')
-OBLIQUE_SETTER = re.compile(r'(.*){o}(.*){/o}(.*)')
-STRONG_SETTER = re.compile(r'(.*){s}(.*){/s}(.*)')
-
 
 class TextView:
     def __init__(self, rect: pygame.Rect, font: pygame.freetype.Font, fgcolor: pygame.Color, bgcolor: pygame.Color):
         self.rect = rect
         self.outline = rect.inflate(2, 2)
-
-        self.font = font
-        self.line_spacing = int(font.get_sized_height() * 1.1)
-
-        self.fgcolor = fgcolor
         self.bgcolor = bgcolor
 
-        rect = font.get_rect(' ')
-        self.space_width = rect.width
-
-        self.text = []  # Chunks are (text, rect, font, fgcolor, bgcolor) tuples
+        # Markup is parsed and the text laid out once, as it's added.
+        self.text = RichText(rect, font, fgcolor)
 
     def draw(self, screen: pygame.Surface):
+        screen.fill(self.bgcolor, self.rect)
         pygame.gfxdraw.rectangle(screen, self.outline, GREEN)
-        x = self.rect.x
-        y = self.rect.y + self.line_spacing
-        for chunk in self.text:  # (w, self.font.get_rect(w), style, fgcolor, bgcolor)
-            word = chunk[0]
-            rect = pygame.Rect(chunk[1])
-            style = chunk[2]
-            fgcolor = chunk[3]
-            bgcolor = chunk[4]
-            if (x - self.rect.x + rect.width) > self.rect.width:
-                x = self.rect.x
-                y += self.line_spacing
-            rect.x = x
-            rect.y = y
-            prev_style = self.font.style
-            self.font.style = style
-            self.font.render_to(screen, rect, word, fgcolor, bgcolor)
-            self.font.style = prev_style
-            x += rect.width + self.space_width
+        self.text.draw(screen)
 
     def add_text(self, text: str):
-        words = text.split()
-        for w in words:
-            fgcolor = self.fgcolor
-            bgcolor = self.bgcolor
-            style = pygame.freetype.STYLE_DEFAULT
-
-            m = BG_SETTER.match(w)
-            if m:
-                parts = m.groups()
-                bgcolor = pygame.Color(parts[1])
-                w = parts[0] + parts[2] + parts[3]
-
-            m = COLOR_SETTER.match(w)
-            if m:
-                parts = m.groups()
-                fgcolor = pygame.Color(parts[1])
-                w = parts[0] + parts[2] + parts[3]
-
-            m = OBLIQUE_SETTER.match(w)
-            if m:
-                parts = m.groups()
-                style = pygame.freetype.STYLE_OBLIQUE
-                w = parts[0] + parts[1] + parts[2]
-
-            m = STRONG_SETTER.match(w)
-            if m:
-                parts = m.groups()
-                style = pygame.freetype.STYLE_STRONG
-                w = parts[0] + parts[1] + parts[2]
-
-            self.text.append((w, self.font.get_rect(w), style, fgcolor, bgcolor))
+        self.text.add_text(text)
 
 
 class Demo:
@@ -117,7 +64,7 @@ class Demo:
 
     def draw(self):
         self.screen.fill(BLACK)
-        self.font.render_to(self.screen, (10, 10), 'Press [Space] to add text.', WHITE)
+        draw_text(self.screen, self.font, (10, 10), 'Press [Space] to add text.', WHITE)
         self.textview.draw(self.screen)
 
     def update(self, dt):
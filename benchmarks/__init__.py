@@ -0,0 +1,6 @@
+# Benchmarks for the experiments and the shared engine.
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Run these from the top of the repo, like: python3 -m benchmarks.demos
@@ -0,0 +1,350 @@
+# Benchmarks - Tile blitting strategies
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+''' Compare ways of drawing a tile map viewport.
+
+The tilemap experiments draw with one blit() per tile; Map.render() in 23 and
+24 says that's faster than blits() because of the cost of building the list.
+This measures that, and some alternatives, for a range of tile sizes,
+viewport sizes and tile pixel formats:
+
+* blit_rect - One blit() per tile, with a new Rect for each (what the
+  experiments do).
+* blit_pos - One blit() per tile, with a position tuple.
+* blits - blits() with a list built every frame.
+* blits_noreturn - Same, with doreturn=False so no list of Rects comes back.
+* blits_reused - blits() with one prebuilt list of [tile, position] pairs;
+  only the tiles are changed each frame.
+* fblits - Surface.fblits() (pygame-ce only) with a list built every frame.
+* chunks - Tiles pre-rendered into 8x8 tile chunks, blit the visible chunks.
+* scroll - Surface.scroll() the previous frame and only draw the newly
+  exposed column of tiles.
+
+The camera moves one tile to the right every frame, so the scrolling and
+chunk strategies can't cheat by drawing the same thing over and over.
+
+From the top of the repo:
+
+    python3 -m benchmarks.blits
+    python3 -m benchmarks.blits --tile-sizes 32 --viewports 1280x720 --formats alpha
+'''
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+
+from benchmarks.stats import summarize  # noqa: E402
+
+DEFAULT_TILE_SIZES = '16,32,64'
+DEFAULT_VIEWPORTS = '640x360,1280x720,1920x1080'
+DEFAULT_FORMATS = 'alpha,opaque,mismatched'
+DEFAULT_FRAMES = 60
+DEFAULT_REPEAT = 5
+
+MAP_SIZE = 256  # Map is 256x256 tiles.
+TILE_COUNT = 64  # Distinct tiles in the atlas.
+CHUNK_SIZE = 8  # Chunks are 8x8 tiles.
+
+
+def make_tiles(tile_size: int, pixel_format: str) -> list:
+    ''' Make an atlas of random tiles, as subsurfaces like Map uses.
+
+    *pixel_format* is "alpha" (32-bit with per-pixel alpha, like
+    convert_alpha()), "opaque" (32-bit, same as the target, like convert()) or
+    "mismatched" (24-bit, so every blit has to convert).
+    '''
+    width = tile_size * 8
+    height = tile_size * (TILE_COUNT // 8)
+    if pixel_format == 'alpha':
+        atlas = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    elif pixel_format == 'opaque':
+        atlas = pygame.Surface((width, height), 0, 32)
+    elif pixel_format == 'mismatched':
+        atlas = pygame.Surface((width, height), 0, 24)
+    else:
+        raise RuntimeError(f'Unknown pixel format: {pixel_format}')
+
+    tiles = []
+    for i in range(TILE_COUNT):
+        rect = pygame.Rect((i % 8) * tile_size, (i // 8) * tile_size, tile_size, tile_size)
+        atlas.fill((random.randint(0, 255), random.randint(0, 255), random.randint(0, 255), 255), rect)
+        # Some detail, with transparency in the alpha tiles.
+        atlas.fill((0, 0, 0, 128), rect.inflate(-tile_size // 2, -tile_size // 2))
+        tiles.append(atlas.subsurface(rect))
+
+    return tiles
+
+
+class Scene:
+    ''' A random tile map, and a target surface to draw it on.
+    '''
+    def __init__(self: 'Scene', tile_size: int, viewport: tuple, pixel_format: str) -> None:
+        self.tile_size = tile_size
+        self.pixel_format = pixel_format
+        self.tiles = make_tiles(tile_size, pixel_format)
+        self.target = pygame.Surface(viewport, 0, 32)
+
+        self.map_width = MAP_SIZE
+        self.map_height = MAP_SIZE
+        self.map_data = [random.randrange(TILE_COUNT) for _ in range(self.map_width * self.map_height)]
+
+        # Visible area in tiles.
+        self.view_width = viewport[0] // tile_size
+        self.view_height = viewport[1] // tile_size
+
+    def camera(self: 'Scene', frame: int) -> tuple:
+        ''' Top-left tile visible on *frame*; the camera scrolls right.
+        '''
+        return frame % (self.map_width - self.view_width), 0
+
+    def tile_at(self: 'Scene', x: int, y: int) -> pygame.Surface:
+        return self.tiles[self.map_data[x + y * self.map_width]]
+
+
+# Strategies: each one takes a Scene and returns a draw(frame) function.
+def blit_rect(scene: Scene):
+    tiles = scene.tiles
+    data = scene.map_data
+    target = scene.target
+    size = scene.tile_size
+
+    def draw(frame: int) -> None:
+        cam_x, cam_y = scene.camera(frame)
+        for y in range(scene.view_height):
+            row = (y + cam_y) * scene.map_width + cam_x
+            for x in range(scene.view_width):
+                target.blit(tiles[data[row + x]], pygame.Rect(x * size, y * size, size, size))
+
+    return draw
+
+
+def blit_pos(scene: Scene):
+    tiles = scene.tiles
+    data = scene.map_data
+    target = scene.target
+    size = scene.tile_size
+
+    def draw(frame: int) -> None:
+        cam_x, cam_y = scene.camera(frame)
+        for y in range(scene.view_height):
+            row = (y + cam_y) * scene.map_width + cam_x
+            for x in range(scene.view_width):
+                target.blit(tiles[data[row + x]], (x * size, y * size))
+
+    return draw
+
+
+def build_sequence(scene: Scene, frame: int) -> list:
+    tiles = scene.tiles
+    data = scene.map_data
+    size = scene.tile_size
+    cam_x, cam_y = scene.camera(frame)
+
+    sequence = []
+    for y in range(scene.view_height):
+        row = (y + cam_y) * scene.map_width + cam_x
+        for x in range(scene.view_width):
+            sequence.append((tiles[data[row + x]], (x * size, y * size)))
+
+    return sequence
+
+
+def blits(scene: Scene):
+    def draw(frame: int) -> None:
+        scene.target.blits(build_sequence(scene, frame))
+
+    return draw
+
+
+def blits_noreturn(scene: Scene):
+    def draw(frame: int) -> None:
+        scene.target.blits(build_sequence(scene, frame), doreturn=False)
+
+    return draw
+
+
+def blits_reused(scene: Scene):
+    tiles = scene.tiles
+    data = scene.map_data
+    size = scene.tile_size
+
+    # One [tile, position] pair per visible cell; positions never change.
+    sequence = [[None, (x * size, y * size)] for y in range(scene.view_height) for x in range(scene.view_width)]
+
+    def draw(frame: int) -> None:
+        cam_x, cam_y = scene.camera(frame)
+        i = 0
+        for y in range(scene.view_height):
+            row = (y + cam_y) * scene.map_width + cam_x
+            for x in range(scene.view_width):
+                sequence[i][0] = tiles[data[row + x]]
+                i += 1
+        scene.target.blits(sequence, doreturn=False)
+
+    return draw
+
+
+def fblits(scene: Scene):
+    def draw(frame: int) -> None:
+        scene.target.fblits(build_sequence(scene, frame))
+
+    return draw
+
+
+def chunks(scene: Scene):
+    size = scene.tile_size
+    chunk_pixels = CHUNK_SIZE * size
+    flags = pygame.SRCALPHA if scene.pixel_format == 'alpha' else 0
+    cache = {}
+
+    def get_chunk(cx: int, cy: int) -> pygame.Surface:
+        chunk = cache.get((cx, cy))
+        if chunk is None:
+            chunk = pygame.Surface((chunk_pixels, chunk_pixels), flags, 32)
+            for y in range(CHUNK_SIZE):
+                for x in range(CHUNK_SIZE):
+                    tx = cx * CHUNK_SIZE + x
+                    ty = cy * CHUNK_SIZE + y
+                    if tx < scene.map_width and ty < scene.map_height:
+                        chunk.blit(scene.tile_at(tx, ty), (x * size, y * size))
+            cache[(cx, cy)] = chunk
+        return chunk
+
+    # Warm the cache; a real renderer would do this at load time.
+    for cy in range((scene.view_height + CHUNK_SIZE - 1) // CHUNK_SIZE + 1):
+        for cx in range(scene.map_width // CHUNK_SIZE):
+            get_chunk(cx, cy)
+
+    def draw(frame: int) -> None:
+        cam_x, cam_y = scene.camera(frame)
+        first_cx = cam_x // CHUNK_SIZE
+        first_cy = cam_y // CHUNK_SIZE
+        last_cx = (cam_x + scene.view_width - 1) // CHUNK_SIZE
+        last_cy = (cam_y + scene.view_height - 1) // CHUNK_SIZE
+        for cy in range(first_cy, last_cy + 1):
+            for cx in range(first_cx, last_cx + 1):
+                scene.target.blit(get_chunk(cx, cy), ((cx * CHUNK_SIZE - cam_x) * size, (cy * CHUNK_SIZE - cam_y) * size))
+
+    return draw
+
+
+def scroll(scene: Scene):
+    size = scene.tile_size
+    last = {'camera': None}
+
+    def draw_columns(cam_x: int, cam_y: int, first: int, last: int) -> None:
+        for y in range(scene.view_height):
+            for x in range(first, last):
+                scene.target.blit(scene.tile_at(cam_x + x, cam_y + y), (x * size, y * size))
+
+    def draw(frame: int) -> None:
+        cam_x, cam_y = scene.camera(frame)
+        previous = last['camera']
+        last['camera'] = (cam_x, cam_y)
+
+        if previous is None or previous[1] != cam_y or abs(cam_x - previous[0]) >= scene.view_width:
+            draw_columns(cam_x, cam_y, 0, scene.view_width)
+            return
+
+        dx = cam_x - previous[0]
+        if dx > 0:
+            scene.target.scroll(-dx * size, 0)
+            draw_columns(cam_x, cam_y, scene.view_width - dx, scene.view_width)
+        elif dx < 0:
+            scene.target.scroll(-dx * size, 0)
+            draw_columns(cam_x, cam_y, 0, -dx)
+
+    return draw
+
+
+STRATEGIES = {
+    'blit_rect': blit_rect,
+    'blit_pos': blit_pos,
+    'blits': blits,
+    'blits_noreturn': blits_noreturn,
+    'blits_reused': blits_reused,
+    'fblits': fblits,
+    'chunks': chunks,
+    'scroll': scroll,
+}
+
+
+def time_strategy(scene: Scene, strategy, frames: int, repeat: int) -> list:
+    ''' Per-frame times in seconds, one per repeat.
+    '''
+    draw = strategy(scene)
+    draw(0)  # Warm up.
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in range(1, frames + 1):
+            draw(frame)
+        times.append((time.perf_counter() - start) / frames)
+
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare tile map blitting strategies.')
+    parser.add_argument('--tile-sizes', default=DEFAULT_TILE_SIZES, help='comma-separated tile sizes in pixels')
+    parser.add_argument('--viewports', default=DEFAULT_VIEWPORTS, help='comma-separated WIDTHxHEIGHT viewports')
+    parser.add_argument('--formats', default=DEFAULT_FORMATS, help='comma-separated tile formats: alpha, opaque, mismatched')
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help='comma-separated strategies to run')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='frames per timing run')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timing runs per strategy')
+    parser.add_argument('-o', '--output', help='also write the results here as JSON')
+    args = parser.parse_args()
+
+    pygame.init()
+    random.seed(0)
+
+    strategies = args.strategies.split(',')
+    if not hasattr(pygame.Surface, 'fblits') and 'fblits' in strategies:
+        print('Surface.fblits() is only in pygame-ce, skipping it.', file=sys.stderr)
+        strategies.remove('fblits')
+
+    results = []
+    for tile_size in (int(x) for x in args.tile_sizes.split(',')):
+        for viewport in args.viewports.split(','):
+            viewport_size = tuple(int(x) for x in viewport.split('x'))
+            for pixel_format in args.formats.split(','):
+                scene = Scene(tile_size, viewport_size, pixel_format)
+                print(f'{tile_size}px tiles, {viewport} viewport, {pixel_format} tiles '
+                      f'({scene.view_width * scene.view_height} tiles per frame):')
+
+                baseline = None
+                for name in strategies:
+                    times = summarize(time_strategy(scene, STRATEGIES[name], args.frames, args.repeat), 1000)
+                    if baseline is None:
+                        baseline = times['p50']
+                    print(f'    {name:16} {times["p50"]:8.3f} ms/frame  {baseline / times["p50"]:5.2f}x')
+
+                    results.append({
+                        'tile_size': tile_size,
+                        'viewport': viewport,
+                        'format': pixel_format,
+                        'strategy': name,
+                        'frame_ms': times,
+                    })
+
+    pygame.quit()
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({'pygame': pygame.version.ver, 'frames': args.frames, 'repeat': args.repeat, 'results': results},
+                      fp, indent=2)
+
+
+if __name__ == '__main__':
+    main()
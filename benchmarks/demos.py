@@ -0,0 +1,416 @@
+# Benchmarks - Headless experiment runner
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+''' Run each experiment's Demo headless with scripted input and time it.
+
+Every experiment is started under SDL's dummy video driver, driven by a small
+input script (walking Sara around, scrolling the map, adding text...) for a
+fixed number of frames, and its draw() and update() times are reported as
+JSON. A second, shorter pass runs with tracemalloc to measure memory
+allocated per frame.
+
+From the top of the repo:
+
+    python3 -m benchmarks.demos                 # Everything.
+    python3 -m benchmarks.demos 26 30           # Just experiments 26 and 30.
+    python3 -m benchmarks.demos -o new.json --baseline old.json
+
+With --baseline, the exit status is 1 if any experiment's median frame time
+got slower than the baseline by more than --tolerance, so this can be used in
+CI on a machine without a GPU.
+'''
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'  # Keep stdout clean for the JSON.
+
+import pygame  # noqa: E402
+
+from benchmarks.stats import summarize  # noqa: E402
+from engine.assets import assets  # noqa: E402
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCREEN_WIDTH = 1280  # Same as the experiments.
+SCREEN_HEIGHT = 720
+
+DEFAULT_FRAMES = 300
+DEFAULT_WARMUP = 10
+DEFAULT_ALLOC_FRAMES = 60
+DEFAULT_TOLERANCE = 0.25
+
+DT = 1 / 60  # Fixed timestep so runs are repeatable.
+
+UP = (pygame.K_w, pygame.K_UP)
+DOWN = (pygame.K_s, pygame.K_DOWN)
+LEFT = (pygame.K_a, pygame.K_LEFT)
+RIGHT = (pygame.K_d, pygame.K_RIGHT)
+
+
+class ScriptedKeyboard:
+    ''' Stands in for pygame.key.get_pressed() while a script holds keys.
+    '''
+    def __init__(self: 'ScriptedKeyboard') -> None:
+        self.held = set()
+
+    def __getitem__(self: 'ScriptedKeyboard', key: int) -> bool:
+        return key in self.held
+
+    def get_pressed(self: 'ScriptedKeyboard') -> 'ScriptedKeyboard':
+        return self
+
+
+class DemoRun:
+    ''' One experiment's Demo plus the state its input script needs.
+    '''
+    def __init__(self: 'DemoRun', name: str, module, demo, keyboard: ScriptedKeyboard) -> None:
+        self.name = name
+        self.module = module
+        self.demo = demo
+        self.keyboard = keyboard
+
+        self.step = 0
+
+    def hold(self: 'DemoRun', keys: tuple) -> None:
+        ''' Hold down *keys* and release everything else.
+        '''
+        self.keyboard.held = set(keys)
+
+        keystate = getattr(self.demo, 'keystate', None)
+        if keystate is not None:
+            for key in keystate:
+                keystate[key] = key in self.keyboard.held
+
+    def next_item(self: 'DemoRun', items):
+        item = items[self.step]
+        self.step = (self.step + 1) % len(items)
+        return item
+
+
+# Input scripts: each is called as script(run, frame) before every frame.
+def idle(run: DemoRun, frame: int) -> None:
+    pass
+
+
+def walk(path: list):
+    ''' Hold each (frames, keys) step in *path* in turn, then loop.
+    '''
+    total = sum(frames for frames, _ in path)
+
+    def script(run: DemoRun, frame: int) -> None:
+        frame %= total
+        for frames, keys in path:
+            if frame < frames:
+                run.hold(keys)
+                return
+            frame -= frames
+
+    return script
+
+
+def every(frames: int, action):
+    ''' Call action(run) once every *frames* frames.
+    '''
+    def script(run: DemoRun, frame: int) -> None:
+        if frame % frames == 0:
+            action(run)
+
+    return script
+
+
+def scroll_view(run: DemoRun) -> None:
+    # Sweep right along the map, then down a row, and back.
+    demo = run.demo
+    row, column = divmod(run.step, demo.map.map_width)
+    if row % 2 == 0:
+        demo.view_right()
+    else:
+        demo.view_left()
+    if column == 0:
+        demo.view_down()
+    run.step += 1
+
+
+def add_text(run: DemoRun) -> None:
+    run.demo.add_text(run.next_item(run.module.TEXT))
+
+
+def add_fancy_text(run: DemoRun) -> None:
+    run.demo.textview.add_text(run.next_item(run.module.FORMATTED_TEXT))
+
+
+def type_text(run: DemoRun) -> None:
+    # The events 04-text-entry's main() hands to its TextInput.
+    char = run.next_item('The quick brown fox jumps over the lazy dog.\r')
+    if char == '\r':
+        event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, mod=0, unicode='\r')
+    else:
+        event = pygame.event.Event(pygame.TEXTINPUT, text=char)
+    run.demo.entry.handle_event(event)
+
+
+def ask_questions(run: DemoRun) -> None:
+    for char in run.next_item(['NAME', 'JOB', 'SOULS', 'WHAT', 'BYE']):
+        run.demo.keydown(ord(char.lower()))
+    run.demo.keydown(pygame.K_RETURN)
+
+
+def click_buttons(run: DemoRun) -> None:
+    pos = run.next_item([(150, 120), (300, 270), (640, 360)])
+    demo = run.demo
+    if hasattr(demo, 'on_mouse_move'):
+        demo.on_mouse_move(pygame.event.Event(pygame.MOUSEMOTION, pos=pos))
+    demo.on_mouse_press(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+    if hasattr(demo, 'on_mouse_release'):
+        demo.on_mouse_release(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1))
+
+
+def cycle_scaling(run: DemoRun) -> None:
+    run.demo.next_scaling()
+
+
+# Walk a loop: right, down, left, up.
+SARA_PATH = [(90, RIGHT), (60, DOWN), (90, LEFT), (60, UP), (20, ())]
+AVATAR_PATH = [(60, RIGHT), (40, DOWN), (60, LEFT), (40, UP), (20, ())]
+
+SCRIPTS = {
+    '02': every(20, add_text),
+    '03': every(20, add_text),
+    '04': every(5, type_text),
+    '06': every(20, add_text),
+    '08': every(20, add_text),
+    '09': every(15, click_buttons),
+    '10': every(15, click_buttons),
+    '11': every(4, scroll_view),
+    '12': every(4, scroll_view),
+    '14': walk(SARA_PATH),
+    '17': walk(SARA_PATH),
+    '18': every(4, scroll_view),
+    '19': walk(SARA_PATH),
+    '20': walk(SARA_PATH),
+    '21': walk(SARA_PATH),
+    '22': every(20, add_fancy_text),
+    '23': walk(SARA_PATH),
+    '24': walk(SARA_PATH),
+    '26': walk(AVATAR_PATH),
+    '27': every(60, cycle_scaling),
+    '28': walk(AVATAR_PATH),
+    '29': every(30, ask_questions),
+    '30': walk(AVATAR_PATH),
+}
+
+
+def find_experiments(wanted: list) -> list:
+    ''' Experiment directories, optionally filtered by name or number prefix.
+    '''
+    found = []
+    for name in sorted(os.listdir(REPO_ROOT)):
+        if not re.match(r'\d\d-', name) or not os.path.isfile(os.path.join(REPO_ROOT, name, 'main.py')):
+            continue
+        if wanted and not any(name.startswith(w) for w in wanted):
+            continue
+        found.append(name)
+
+    return found
+
+
+def load_experiment(name: str):
+    path = os.path.join(REPO_ROOT, name, 'main.py')
+    spec = importlib.util.spec_from_file_location(f'experiment_{name[:2]}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def run_frames(run: DemoRun, script, first: int, count: int, on_frame=None) -> tuple:
+    ''' Run *count* frames; returns lists of draw and update times.
+    '''
+    draw_times = []
+    update_times = []
+    for frame in range(first, first + count):
+        script(run, frame)
+
+        if on_frame:
+            on_frame(True)
+
+        start = time.perf_counter()
+        run.demo.draw()
+        drawn = time.perf_counter()
+        run.demo.update(DT)
+        updated = time.perf_counter()
+
+        if on_frame:
+            on_frame(False)
+
+        draw_times.append(drawn - start)
+        update_times.append(updated - drawn)
+
+        pygame.display.flip()
+        pygame.event.pump()
+
+    return draw_times, update_times
+
+
+def benchmark(name: str, frames: int, warmup: int, alloc_frames: int) -> dict:
+    cwd = os.getcwd()
+    real_get_pressed = pygame.key.get_pressed
+    keyboard = ScriptedKeyboard()
+    try:
+        os.chdir(os.path.join(REPO_ROOT, name))  # Resources are relative.
+        random.seed(0)
+
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.key.get_pressed = keyboard.get_pressed
+
+        module = load_experiment(name)
+
+        start = time.perf_counter()
+        demo = module.Demo(screen)
+        if getattr(demo, 'loader', None) is not None:
+            demo.loader.wait()  # Count background loading as start-up time.
+        init_time = time.perf_counter() - start
+
+        run = DemoRun(name, module, demo, keyboard)
+        script = SCRIPTS.get(name[:2], idle)
+
+        run_frames(run, script, 0, warmup)
+        draw_times, update_times = run_frames(run, script, warmup, frames)
+
+        result = {
+            'init_ms': init_time * 1000,
+            'draw_ms': summarize(draw_times, 1000),
+            'update_ms': summarize(update_times, 1000),
+            'frame_ms': summarize([d + u for d, u in zip(draw_times, update_times)], 1000),
+        }
+
+        if alloc_frames > 0:
+            result.update(measure_allocations(run, script, warmup + frames, alloc_frames))
+
+        return result
+    finally:
+        pygame.key.get_pressed = real_get_pressed
+        assets.clear()  # Nothing's shared between experiments.
+        pygame.quit()
+        os.chdir(cwd)
+
+
+def measure_allocations(run: DemoRun, script, first: int, count: int) -> dict:
+    ''' Memory allocated per frame, measured with tracemalloc.
+
+    alloc_kib is the peak memory allocated during each frame (temporaries
+    included), net_blocks is how many more memory blocks were alive after the
+    frame than before it.
+    '''
+    peaks = []
+    blocks = []
+    before = {}
+
+    def on_frame(starting: bool) -> None:
+        if starting:
+            before['memory'] = tracemalloc.get_traced_memory()[0]
+            before['blocks'] = sys.getallocatedblocks()
+            tracemalloc.reset_peak()
+        else:
+            peaks.append(tracemalloc.get_traced_memory()[1] - before['memory'])
+            blocks.append(sys.getallocatedblocks() - before['blocks'])
+
+    tracemalloc.start()
+    try:
+        run_frames(run, script, first, count, on_frame)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'alloc_kib': summarize(peaks, 1 / 1024),
+        'net_blocks': summarize(blocks),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    ''' List the experiments whose median frame time regressed.
+    '''
+    regressions = []
+    for name, result in results['experiments'].items():
+        old = baseline.get('experiments', {}).get(name)
+        if not old or 'frame_ms' not in old or 'frame_ms' not in result:
+            continue
+
+        old_ms = old['frame_ms']['p50']
+        new_ms = result['frame_ms']['p50']
+        if old_ms > 0 and new_ms > old_ms * (1 + tolerance):
+            regressions.append(f'{name}: median frame {old_ms:.3f} ms -> {new_ms:.3f} ms')
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the experiments without a window.')
+    parser.add_argument('experiments', nargs='*', help='experiment names or number prefixes (default: all)')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='timed frames per experiment')
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help='untimed frames before timing')
+    parser.add_argument('--alloc-frames', type=int, default=DEFAULT_ALLOC_FRAMES,
+                        help='frames to run under tracemalloc (0 to skip)')
+    parser.add_argument('-o', '--output', help='write JSON here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON output to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown vs. the baseline, 0.25 == 25%%')
+    args = parser.parse_args()
+
+    results = {
+        'python': sys.version.split()[0],
+        'pygame': pygame.version.ver,
+        'sdl': '.'.join(str(x) for x in pygame.get_sdl_version()),
+        'video_driver': os.environ['SDL_VIDEODRIVER'],
+        'frames': args.frames,
+        'warmup': args.warmup,
+        'alloc_frames': args.alloc_frames,
+        'dt': DT,
+        'experiments': {},
+    }
+
+    failed = False
+    for name in find_experiments(args.experiments):
+        print(f'Running {name}...', file=sys.stderr)
+        try:
+            # Some experiments print; keep stdout for the JSON.
+            with contextlib.redirect_stdout(sys.stderr):
+                results['experiments'][name] = benchmark(name, args.frames, args.warmup, args.alloc_frames)
+        except Exception as ex:
+            results['experiments'][name] = {'error': f'{type(ex).__name__}: {ex}'}
+            failed = True
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        failed = failed or len(regressions) > 0
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
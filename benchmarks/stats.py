@@ -0,0 +1,40 @@
+# Benchmarks - Statistics helpers
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import math
+import statistics
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered: list, pct: float) -> float:
+    ''' Nearest-rank percentile of an already-sorted list.
+    '''
+    if not ordered:
+        return 0.0
+
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: list, scale: float = 1.0) -> dict:
+    ''' Summarize samples as mean, min, max and percentiles.
+
+    Everything is multiplied by *scale*, so you can pass 1000 to turn seconds
+    into milliseconds.
+    '''
+    ordered = sorted(x * scale for x in samples)
+    if not ordered:
+        return {'mean': 0.0, 'min': 0.0, 'max': 0.0}
+
+    result = {
+        'mean': statistics.fmean(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+    }
+    for pct in PERCENTILES:
+        result[f'p{pct}'] = percentile(ordered, pct)
+
+    return result
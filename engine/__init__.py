@@ -0,0 +1,102 @@
+# Shared engine code for the experiments.
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# The experiments are run from their own directories, so they add the top of
+# the repo to sys.path before importing anything from here.
+#
+# Submodules are only imported when something from them is first used, so
+# `from engine import Map` doesn't drag in the sprite, text and UI code too.
+
+import importlib
+
+# Public name -> submodule it lives in.
+_EXPORTS = {
+    'run': 'app',
+    'SCREEN_WIDTH': 'app',
+    'SCREEN_HEIGHT': 'app',
+
+    'AssetManager': 'assets',
+    'load_font': 'assets',
+    'load_image': 'assets',
+
+    'pack_tiles': 'atlas',
+
+    'BitmapFont': 'bitmapfont',
+
+    'Camera': 'camera',
+    'scale_surface': 'camera',
+
+    'LayerCompositor': 'compositor',
+
+    'Conversation': 'dialogue',
+    'load_dialogue': 'dialogue',
+    'Script': 'dialogue',
+
+    'FixedStep': 'follow',
+    'Follow': 'follow',
+
+    'Loader': 'loader',
+
+    'Minimap': 'minimap',
+
+    'parse_markup': 'richtext',
+    'RichText': 'richtext',
+
+    'FRAMES': 'sprite',
+    'LPC_ANIMATION': 'sprite',
+    'LPC_FACING': 'sprite',
+    'LPCSprite': 'sprite',
+
+    'draw_text': 'text',
+    'effect_text': 'text',
+    'glow': 'text',
+    'OUTLINE': 'text',
+    'SHADOW': 'text',
+    'SHADOW_CORNERS': 'text',
+    'shadow_text': 'text',
+    'TextCache': 'text',
+    'text_cache': 'text',
+    'WordWidths': 'text',
+    'wrap_document': 'text',
+    'wrap_text': 'text',
+
+    'GapBuffer': 'textinput',
+    'TextInput': 'textinput',
+
+    'SCROLLBACK': 'textlog',
+    'TextLog': 'textlog',
+
+    'Map': 'tilemap',
+    'parse_map': 'tilemap',
+
+    'SCROLL_SPEED': 'typewriter',
+    'TYPE_SPEED': 'typewriter',
+    'Typewriter': 'typewriter',
+
+    'Frame': 'ui',
+    'RPG_GUI_FRAME': 'ui',
+    'load_frame': 'ui',
+
+    'choose_scaler': 'upscale',
+    'Upscaler': 'upscale',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    module = importlib.import_module(f'.{module_name}', __name__)
+    value = getattr(module, name)
+    globals()[name] = value  # Only look it up once.
+
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,78 @@
+# Engine - Main loop
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import sys
+import time
+
+from . import trace
+from .upscale import Upscaler
+
+SCREEN_WIDTH = 1280  # 720p screen
+SCREEN_HEIGHT = 720
+
+
+def run(demo_class, title: str, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT, scale: int = 1) -> None:
+    ''' Open a window, then draw and update a *demo_class* until we're done.
+
+    The loop handles QUIT and Escape. If the demo has a *keystate* dict, it's
+    kept up to date with KEYDOWN/KEYUP events. Every other event is passed to
+    the demo's on_event() method, if it has one.
+
+    With a *scale* other than 1, the demo draws on a *width* x *height*
+    offscreen surface that's upscaled to fit a resizable window (*scale*
+    times bigger to start with) once per frame. Mouse positions in events are
+    converted back to the demo's pixels.
+    '''
+    pygame.init()
+
+    upscaler = None
+    if scale == 1:
+        screen = pygame.display.set_mode((width, height))
+    else:
+        window = pygame.display.set_mode((width * scale, height * scale), pygame.RESIZABLE)
+        upscaler = Upscaler((width, height), window)
+        screen = upscaler.surface
+    pygame.display.set_caption(title)
+
+    demo = demo_class(screen)
+    keystate = getattr(demo, 'keystate', None)
+    on_event = getattr(demo, 'on_event', None)
+
+    now = time.time()
+    dt = 0
+
+    playing = True
+
+    while playing:
+        demo.draw()
+        if upscaler is not None:
+            upscaler.present()
+        pygame.display.flip()
+        trace.next_frame()
+
+        dt = time.time() - now
+        now = time.time()
+
+        demo.update(dt)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                playing = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                playing = False
+            else:
+                if upscaler is not None:
+                    if event.type == pygame.VIDEORESIZE:
+                        upscaler.resize(pygame.display.get_surface())
+                    elif hasattr(event, 'pos'):
+                        event = pygame.event.Event(event.type, dict(event.dict, pos=upscaler.to_native(event.pos)))
+                if keystate is not None and event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                    keystate[event.key] = event.type == pygame.KEYDOWN
+                if on_event is not None:
+                    on_event(event)
+
+    pygame.quit()
+    sys.exit()
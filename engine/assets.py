@@ -0,0 +1,169 @@
+# Engine - Asset manager
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Images and fonts are cached by absolute path (and conversion mode or point
+# size), so loading the same atlas from several maps or sprites only decodes
+# and converts it once. Everyone gets the *same* Surface or Font back, so
+# don't draw on a cached image or change a cached font's style; copy() it
+# first.
+
+import os
+import pygame
+import pygame.freetype
+import sys
+
+from collections import OrderedDict
+
+# How an image is converted after loading; None leaves it in the file's
+# format.
+CONVERSIONS = ('alpha', 'opaque', None)
+
+DEFAULT_BUDGET = 256 * 1024 * 1024  # bytes
+
+
+class _Entry:
+    __slots__ = ('asset', 'size')
+
+    def __init__(self: '_Entry', asset: any, size: int) -> None:
+        self.asset = asset
+        self.size = size
+
+
+# sys.getrefcount() of an entry's asset when only the cache knows about it:
+# one for _Entry.asset, one for getrefcount()'s argument.
+_UNREFERENCED = 2
+
+
+def surface_size(surface: pygame.Surface) -> int:
+    ''' Approximate memory used by *surface*'s pixels, in bytes.
+    '''
+    return surface.get_pitch() * surface.get_height()
+
+
+class AssetManager:
+    ''' Shared cache for images and fonts.
+
+    The cache is kept in least-recently-used order. When it grows past
+    *budget* bytes, the oldest assets that nobody else is holding on to are
+    dropped; assets still in use are never evicted, so the budget can be
+    exceeded if everything's in use.
+    '''
+    def __init__(self: 'AssetManager', budget: int = DEFAULT_BUDGET) -> None:
+        self.budget = budget
+        self.cache = OrderedDict()  # key -> _Entry
+        self.memory = 0  # bytes
+
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def image(self: 'AssetManager', path: str, mode: str = 'alpha') -> pygame.Surface:
+        ''' Load the image at *path*, converted for the display.
+
+        *mode* is 'alpha' for convert_alpha(), 'opaque' for convert(), or None
+        to skip conversion (useful before the display is set up).
+        '''
+        if mode not in CONVERSIONS:
+            raise ValueError('Unknown conversion mode: {0}'.format(mode))
+
+        key = ('image', os.path.abspath(path), mode)
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry.asset
+
+        return self.store(key, self.convert(pygame.image.load(path), mode))
+
+    def convert(self: 'AssetManager', surface: pygame.Surface, mode: str) -> pygame.Surface:
+        if mode == 'alpha':
+            return surface.convert_alpha()
+        elif mode == 'opaque':
+            return surface.convert()
+
+        return surface
+
+    def font(self: 'AssetManager', path: str, size: int) -> pygame.freetype.Font:
+        ''' Load the font at *path* with the given point *size*.
+        '''
+        key = ('font', os.path.abspath(path), size)
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry.asset
+
+        return self.store(key, pygame.freetype.Font(path, size), os.path.getsize(path))
+
+    def lookup(self: 'AssetManager', key: tuple) -> _Entry:
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+
+        return entry
+
+    def store(self: 'AssetManager', key: tuple, asset: any, size: int = None) -> any:
+        ''' Add an already-loaded *asset* to the cache under *key*.
+        '''
+        if size is None:
+            size = surface_size(asset)
+
+        old = self.cache.pop(key, None)
+        if old is not None:
+            self.memory -= old.size
+
+        self.cache[key] = _Entry(asset, size)
+        self.memory += size
+        self.loads += 1
+
+        if self.memory > self.budget:
+            self.evict(self.budget)
+
+        return asset
+
+    def evict(self: 'AssetManager', target: int = 0) -> int:
+        ''' Drop unreferenced assets, oldest first, until we're using at most
+        *target* bytes.
+
+        Returns the number of bytes freed.
+        '''
+        freed = 0
+        for key in list(self.cache):
+            if self.memory <= target:
+                break
+
+            entry = self.cache[key]
+            if sys.getrefcount(entry.asset) > _UNREFERENCED:
+                continue  # Still in use.
+
+            del self.cache[key]
+            self.memory -= entry.size
+            freed += entry.size
+            self.evictions += 1
+
+        return freed
+
+    def clear(self: 'AssetManager') -> None:
+        self.cache.clear()
+        self.memory = 0
+
+    def stats(self: 'AssetManager') -> dict:
+        return {
+            'assets': len(self.cache),
+            'memory': self.memory,
+            'budget': self.budget,
+            'hits': self.hits,
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
+
+
+# Shared by everything that doesn't make its own.
+assets = AssetManager()
+
+
+def load_image(path: str, mode: str = 'alpha') -> pygame.Surface:
+    return assets.image(path, mode)
+
+
+def load_font(path: str, size: int) -> pygame.freetype.Font:
+    return assets.font(path, size)
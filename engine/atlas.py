@@ -0,0 +1,32 @@
+# Engine - Texture atlas packing
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import math
+import pygame
+
+
+def pack_tiles(sources: list, tile_width: int, tile_height: int) -> tuple:
+    ''' Copy same-sized tiles from any number of images into one atlas.
+
+    *sources* is a list of (image, area) pairs. The atlas is roughly square,
+    and is converted to the display format once, after everything's copied.
+
+    Returns the atlas and a list of subsurfaces, one per source, in order.
+    '''
+    count = max(1, len(sources))
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+
+    atlas = pygame.Surface((columns * tile_width, rows * tile_height), pygame.SRCALPHA, 32)
+    rects = [pygame.Rect((i % columns) * tile_width, (i // columns) * tile_height, tile_width, tile_height)
+             for i in range(len(sources))]
+
+    # The atlas starts out fully transparent, so BLEND_RGBA_MAX copies the
+    # source pixels exactly instead of alpha-blending them onto black.
+    atlas.blits([(image, rect, area, pygame.BLEND_RGBA_MAX) for (image, area), rect in zip(sources, rects)],
+                doreturn=False)
+    atlas = atlas.convert_alpha()
+
+    return atlas, [atlas.subsurface(rect) for rect in rects]
@@ -0,0 +1,233 @@
+# Engine - Glyph atlas fonts
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Text that changes every frame (counters, joystick readouts) can't be
+# cached as whole strings, so every render_to() goes through FreeType's
+# layout and rasterizer. A BitmapFont rasterizes each glyph once into an
+# atlas, then draws strings with a single blits() call from it.
+
+import pygame
+import pygame.freetype
+
+from collections import OrderedDict
+
+WHITE = pygame.Color('white')
+
+# Printable ASCII and Latin-1.
+DEFAULT_CHARS = ''.join(chr(i) for i in range(32, 127)) + ''.join(chr(i) for i in range(160, 256))
+ATLAS_WIDTH = 512  # pixels
+LAYOUT_CACHE_SIZE = 256  # strings
+
+
+class BitmapFont:
+    ''' A pygame.freetype.Font's glyphs, pre-rendered into one atlas.
+
+    Supports the parts of the Font API the experiments use: render_to(),
+    render(), get_rect(), get_sized_height(), get_sized_glyph_height() and
+    the origin flag. Each colour gets its own tinted copy of the atlas the
+    first time it's used. Strings with characters outside *chars* (or with a
+    style or size) are handed to the real font.
+
+    Kerning follows the font's kerning flag; each pair's adjustment is
+    measured once, the first time it shows up.
+    '''
+    def __init__(self: 'BitmapFont', font: pygame.freetype.Font, chars: str = DEFAULT_CHARS) -> None:
+        self.font = font
+        self.size = font.size
+        self.origin = font.origin
+        self.kerning = font.kerning
+        self.kerning_pairs = {}  # (left, right) -> pixels
+
+        self.glyphs = {}  # char -> (atlas area, bearing x, top, bottom, advance, right edge)
+        self.layouts = OrderedDict()  # (text, kerning) -> layout()
+        rendered = []
+        for char in dict.fromkeys(chars):  # Unique, in order.
+            metrics = font.get_metrics(char)
+            if not metrics or metrics[0] is None:
+                continue  # Not in the font.
+
+            surface, rect = font.render(char, WHITE)
+            rendered.append((char, surface, rect, metrics[0][4]))
+
+        self.atlas = self.pack(rendered)
+        self.tinted = {}  # colour -> tinted copy of the atlas
+
+    def pack(self: 'BitmapFont', rendered: list) -> pygame.Surface:
+        ''' Shelf-pack the *rendered* glyphs into an atlas.
+        '''
+        x = 0
+        y = 0
+        shelf_height = 0
+        places = []
+        for char, surface, rect, advance in sorted(rendered, key=lambda glyph: -glyph[1].get_height()):
+            width, height = surface.get_size()
+            if x + width > ATLAS_WIDTH:
+                x = 0
+                y += shelf_height + 1
+                shelf_height = 0
+
+            # Blank glyphs (spaces) still take up their advance.
+            area = pygame.Rect(x, y, width, height)
+            extent = rect.x + width if height > 0 else round(advance)
+            self.glyphs[char] = (area, rect.x, -rect.y, height - rect.y, advance, extent)
+            places.append((surface, area))
+
+            x += width + 1
+            shelf_height = max(shelf_height, height)
+
+        # The atlas starts out fully transparent, so BLEND_RGBA_MAX copies the
+        # glyphs exactly.
+        atlas = pygame.Surface((ATLAS_WIDTH, max(1, y + shelf_height)), pygame.SRCALPHA, 32)
+        atlas.blits([(surface, area, None, pygame.BLEND_RGBA_MAX)
+                     for surface, area in places if area.width > 0 and area.height > 0], doreturn=False)
+
+        return atlas.convert_alpha() if pygame.display.get_surface() is not None else atlas
+
+    def get_atlas(self: 'BitmapFont', color: pygame.Color) -> pygame.Surface:
+        key = tuple(pygame.Color(color))
+        atlas = self.tinted.get(key)
+        if atlas is None:
+            atlas = self.atlas.copy()
+            atlas.fill(key, special_flags=pygame.BLEND_RGBA_MULT)
+            self.tinted[key] = atlas
+
+        return atlas
+
+    def get_kerning(self: 'BitmapFont', left: str, right: str) -> float:
+        pair = (left, right)
+        kerning = self.kerning_pairs.get(pair)
+        if kerning is None:
+            # Measure with and without kerning, then put the caller's setting back.
+            was_kerning = self.font.kerning
+            try:
+                self.font.kerning = False
+                plain = self.font.get_rect(left + right).width
+                self.font.kerning = True
+                kerning = self.font.get_rect(left + right).width - plain
+            finally:
+                self.font.kerning = was_kerning
+            self.kerning_pairs[pair] = kerning
+
+        return kerning
+
+    def layout(self: 'BitmapFont', text: str) -> tuple:
+        ''' Place *text*'s glyphs relative to the baseline's starting point.
+
+        Returns a list of (atlas area, x, y) and the text's bounding Rect,
+        measured the same way as Font.get_rect(); None if a character isn't
+        in the atlas. Recent layouts are remembered.
+        '''
+        if not text:
+            return None  # Leave the odd empty-string metrics to FreeType.
+
+        key = (text, self.kerning)
+        laid_out = self.layouts.get(key)
+        if laid_out is not None:
+            self.layouts.move_to_end(key)
+            return laid_out
+
+        glyphs = self.glyphs
+        placed = []
+        left = right = top = bottom = None
+        pen = 0.0
+        previous = None
+        for char in text:
+            glyph = glyphs.get(char)
+            if glyph is None:
+                return None
+
+            area, bearing_x, glyph_top, glyph_bottom, advance, extent = glyph
+            if self.kerning and previous is not None:
+                pen += self.get_kerning(previous, char)
+            x = round(pen)
+            if area.width > 0 and area.height > 0:
+                placed.append((area, x + bearing_x, glyph_top))
+
+            if left is None:
+                left = x + bearing_x
+                right = x + extent
+            else:
+                left = min(left, x + bearing_x)
+                right = max(right, x + extent)
+            if area.height > 0:
+                top = glyph_top if top is None else min(top, glyph_top)
+                bottom = glyph_bottom if bottom is None else max(bottom, glyph_bottom)
+
+            pen += advance
+            previous = char
+
+        top = top or 0
+        rect = pygame.Rect(left, -top, right - left, (bottom or 0) - top)
+
+        laid_out = (placed, rect)
+        self.layouts[key] = laid_out
+        if len(self.layouts) > LAYOUT_CACHE_SIZE:
+            self.layouts.popitem(last=False)
+
+        return laid_out
+
+    def get_rect(self: 'BitmapFont', text: str, style: int = pygame.freetype.STYLE_DEFAULT,
+                 rotation: int = 0, size: float = 0) -> pygame.Rect:
+        laid_out = self.layout(text) if style == pygame.freetype.STYLE_DEFAULT and size == 0 else None
+        if laid_out is None:
+            return self.font.get_rect(text, style, rotation, size)
+
+        return laid_out[1]
+
+    def get_sized_height(self: 'BitmapFont', size: float = 0) -> int:
+        return self.font.get_sized_height(size)
+
+    def get_sized_glyph_height(self: 'BitmapFont', size: float = 0) -> int:
+        return self.font.get_sized_glyph_height(size)
+
+    def render_to(self: 'BitmapFont', surface: pygame.Surface, dest: tuple, text: str, fgcolor: pygame.Color = None,
+                  bgcolor: pygame.Color = None, style: int = pygame.freetype.STYLE_DEFAULT, rotation: int = 0,
+                  size: float = 0) -> pygame.Rect:
+        ''' Draw *text* on *surface*, like Font.render_to().
+        '''
+        if fgcolor is None:
+            fgcolor = self.font.fgcolor
+
+        laid_out = None
+        if style == pygame.freetype.STYLE_DEFAULT and rotation == 0 and size == 0:
+            laid_out = self.layout(text)
+        if laid_out is None:
+            return self.font.render_to(surface, dest, text, fgcolor, bgcolor, style, rotation, size)
+
+        placed, rect = laid_out
+        if not placed:
+            return pygame.Rect(0, 0, 0, self.font.get_sized_height())  # Nothing to draw, same as FreeType.
+
+        if self.origin:
+            x = dest[0]  # dest is the start of the baseline
+            y = dest[1]
+        else:
+            x = dest[0] - rect.x  # dest is the top-left of the text
+            y = dest[1] + rect.y
+
+        target = pygame.Rect(x + rect.x, y - rect.y, rect.width, rect.height)
+        if bgcolor is not None:
+            surface.fill(bgcolor, target)
+
+        atlas = self.get_atlas(fgcolor)
+        surface.blits([(atlas, (x + glyph_x, y + glyph_y), area) for area, glyph_x, glyph_y in placed], doreturn=False)
+
+        return target.clip(surface.get_rect())
+
+    def render(self: 'BitmapFont', text: str, fgcolor: pygame.Color = None, bgcolor: pygame.Color = None,
+               style: int = pygame.freetype.STYLE_DEFAULT, rotation: int = 0, size: float = 0) -> tuple:
+        ''' Draw *text* on a new surface, like Font.render().
+        '''
+        rect = self.get_rect(text, style, rotation, size)
+        surface = pygame.Surface((max(1, rect.width), max(1, rect.height)), pygame.SRCALPHA, 32)
+        if bgcolor is not None:
+            surface.fill(bgcolor)
+
+        origin = self.origin
+        self.origin = False
+        self.render_to(surface, (0, 0), text, fgcolor, None, style, rotation, size)
+        self.origin = origin
+
+        return surface, rect
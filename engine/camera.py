@@ -0,0 +1,453 @@
+# Engine - Camera for tile maps
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Zooming scales whole chunks of the map instead of single tiles, once per
+# zoom level, so a frame at any scale is a blit per visible chunk. Chunk
+# edges are rounded from the same unscaled positions every time, so
+# fractional scales don't leave seams between chunks.
+#
+# Like the compositor's chunks, these are converted to premultiplied alpha
+# once they're built and scaled, so they can be drawn with
+# BLEND_PREMULTIPLIED.
+
+import math
+import pygame
+import time
+
+from collections import OrderedDict, deque
+
+from . import trace
+from .assets import surface_size
+from .tilemap import GID_MASK, Map
+
+CHUNK_PIXELS = 256  # Rough size of a prescaled chunk on screen.
+ZOOM_BUDGET = 32 * 1024 * 1024  # bytes of prescaled chunks per zoom level
+ZOOM_LEVELS = 8  # Zoom levels kept at once; the least recently used go first.
+WARM_TIME = 0.002  # seconds per update() spent prescaling chunks for warm()
+
+
+def scale_surface(surface: pygame.Surface, size: tuple, algorithm: callable) -> pygame.Surface:
+    ''' Scale *surface* to *size* with a pygame.transform function.
+
+    scale2x() can only double, so it's used as many times as it fits and
+    scale() makes up the rest.
+    '''
+    if algorithm == pygame.transform.scale2x:
+        while surface.get_width() * 2 <= size[0] and surface.get_height() * 2 <= size[1]:
+            surface = algorithm(surface)
+        algorithm = pygame.transform.scale
+
+    if surface.get_size() == tuple(size):
+        return surface
+
+    return algorithm(surface, size)
+
+
+class ZoomLevel:
+    ''' A map's layers cut into chunks and prescaled for one zoom level.
+
+    Chunks are roughly CHUNK_PIXELS square after scaling, no matter what the
+    scale is. They're kept in least-recently-used order, and the oldest are
+    dropped once they use more than *budget* bytes.
+    '''
+    def __init__(self: 'ZoomLevel', the_map: Map, scale: float, algorithm: callable,
+                 budget: int = ZOOM_BUDGET) -> None:
+        self.map = the_map
+        self.scale = scale
+        self.algorithm = algorithm
+        self.budget = budget
+        self.key = (scale, algorithm)
+
+        self.chunk_size = max(1, round(CHUNK_PIXELS / (scale * max(the_map.tile_width, the_map.tile_height))))
+        self.chunks = OrderedDict()  # (layer, chunk x, chunk y) -> Surface
+        self.memory = 0  # bytes
+
+    def scaled(self: 'ZoomLevel', pixels: float) -> int:
+        ''' Scale an unscaled pixel position.
+        '''
+        return round(pixels * self.scale)
+
+    def chunk_span(self: 'ZoomLevel', start: int, length: int, tile_size: int) -> range:
+        ''' Chunk numbers covering scaled pixels *start* to *start* + *length*.
+        '''
+        chunk_pixels = self.chunk_size * tile_size
+        first = math.floor(start / (chunk_pixels * self.scale))
+        if self.scaled(first * chunk_pixels) > start:
+            first -= 1
+
+        end = start + length
+        last = math.floor((end - 1) / (chunk_pixels * self.scale))
+        if self.scaled((last + 1) * chunk_pixels) < end:
+            last += 1
+
+        return range(first, last + 1)
+
+    def chunk_rect(self: 'ZoomLevel', cx: int, cy: int) -> pygame.Rect:
+        ''' Scaled pixel rectangle covered by chunk cx,cy.
+        '''
+        chunk_w = self.chunk_size * self.map.tile_width
+        chunk_h = self.chunk_size * self.map.tile_height
+        x = self.scaled(cx * chunk_w)
+        y = self.scaled(cy * chunk_h)
+
+        return pygame.Rect(x, y, self.scaled((cx + 1) * chunk_w) - x, self.scaled((cy + 1) * chunk_h) - y)
+
+    def get_chunk(self: 'ZoomLevel', layer: str, cx: int, cy: int, edge_tile: int) -> pygame.Surface:
+        cells = pygame.Rect(cx * self.chunk_size, cy * self.chunk_size, self.chunk_size, self.chunk_size)
+        inside = cells.clip(pygame.Rect(0, 0, self.map.map_width, self.map.map_height))
+        rect = self.chunk_rect(cx, cy)
+        if inside.width == 0 or inside.height == 0:
+            key = (layer, None, rect.size)  # All edge, so any chunk this size will do.
+        else:
+            key = (layer, cx, cy)
+
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        chunk = self.build_chunk(layer, cells, inside, edge_tile, rect.size)
+        self.chunks[key] = chunk
+        self.memory += surface_size(chunk)
+        while self.memory > self.budget and len(self.chunks) > 1:
+            _, old = self.chunks.popitem(last=False)
+            self.memory -= surface_size(old)
+
+        return chunk
+
+    def build_chunk(self: 'ZoomLevel', layer: str, cells: pygame.Rect, inside: pygame.Rect, edge_tile: int,
+                    size: tuple) -> pygame.Surface:
+        tile_w = self.map.tile_width
+        tile_h = self.map.tile_height
+        chunk = pygame.Surface((cells.width * tile_w, cells.height * tile_h), pygame.SRCALPHA, 32).convert_alpha()
+        chunk.fill((0, 0, 0, 0))
+
+        inside_rect = pygame.Rect((inside.x - cells.x) * tile_w, (inside.y - cells.y) * tile_h,
+                                  inside.width * tile_w, inside.height * tile_h)
+        edge = self.map.get_tile_texture(edge_tile) if edge_tile != 0 else None
+        if edge is not None and inside != cells:
+            chunk.blits([(edge, (x * tile_w, y * tile_h)) for y in range(cells.height) for x in range(cells.width)],
+                        doreturn=False)
+            chunk.fill((0, 0, 0, 0), inside_rect)
+
+        if inside.width > 0 and inside.height > 0:
+            self.map.render(layer, chunk, inside, inside_rect.x, inside_rect.y)
+
+        return scale_surface(chunk, size, self.algorithm).premul_alpha()
+
+    def drop_edge_chunks(self: 'ZoomLevel') -> None:
+        ''' Forget chunks with any edge tiles in them, so they're rebuilt
+        with the edge tile's current frame.
+        '''
+        map_cells = pygame.Rect(0, 0, self.map.map_width, self.map.map_height)
+        for key in list(self.chunks):
+            _, cx, cy = key
+            if cx is not None:
+                cells = pygame.Rect(cx * self.chunk_size, cy * self.chunk_size, self.chunk_size, self.chunk_size)
+                if map_cells.contains(cells):
+                    continue
+            self.memory -= surface_size(self.chunks.pop(key))
+
+    def redraw_cell(self: 'ZoomLevel', layer: str, x: int, y: int) -> None:
+        ''' Redraw map cell x,y if its chunk is cached.
+        '''
+        cx = x // self.chunk_size
+        cy = y // self.chunk_size
+        chunk = self.chunks.get((layer, cx, cy))
+        if chunk is None:
+            return
+
+        origin = self.chunk_rect(cx, cy)
+        left = self.scaled(x * self.map.tile_width)
+        top = self.scaled(y * self.map.tile_height)
+        target = pygame.Rect(left - origin.x, top - origin.y, self.scaled((x + 1) * self.map.tile_width) - left,
+                             self.scaled((y + 1) * self.map.tile_height) - top)
+
+        chunk.fill((0, 0, 0, 0), target)
+        tile = self.map.get_tile_texture(self.map.get_tile(layer, x, y))
+        if tile is not None:
+            # Tiles are often subsurfaces, which premul_alpha() doesn't handle; copy it into a cell first.
+            cell = pygame.Surface(target.size, pygame.SRCALPHA, 32).convert_alpha()
+            cell.fill((0, 0, 0, 0))
+            cell.blit(scale_surface(tile, target.size, self.algorithm), (0, 0))
+            chunk.blit(cell.premul_alpha(), target, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+
+class Camera:
+    ''' Camera/viewport for a tile-based map.
+    '''
+    def __init__(self: 'Camera', screen: pygame.Surface, the_map: Map) -> None:
+        self.screen = screen
+        self.map = the_map
+
+        # Co-ordinates are in *tiles*, not pixels.
+        self.x = 0
+        self.y = 0
+        self.tile_width = 0
+        self.tile_height = 0
+
+        # Co-ordinates are in *pixels*, not tiles.
+        self.viewport = None
+        self.offset_x = 0  # 0 == aligned to tile boundary
+        self.offset_y = 0  # 0 == aligned to tile boundary
+
+        # Tile to use for out-of-bounds tiles, and a surface tiled with it.
+        self.edge_tile = 0
+        self.edge_surface = None
+        self.edge_frame = None
+
+        # Are we scaled?
+        self.scale = 1
+        self.scale_algo = None  # pygame.transform function for scaling
+        self.zoom = None  # ZoomLevel for the current scale, None at 1x.
+        self.zoom_levels = OrderedDict()  # (scale, algorithm) -> ZoomLevel
+        self.warm_queue = deque()  # (ZoomLevel, layer, chunk x, chunk y)
+
+    def set_viewport(self: 'Camera', viewport: pygame.Rect) -> None:
+        ''' Set the camera's on-screen viewport.
+
+        Partial tiles at the right and bottom edges count, so the whole
+        viewport gets drawn.
+        '''
+        self.viewport = viewport
+
+        self.tile_width = math.ceil(viewport.width / (self.map.tile_width * self.scale))
+        self.tile_height = math.ceil(viewport.height / (self.map.tile_height * self.scale))
+
+    def set_position(self: 'Camera', x: int, y: int) -> None:
+        self.x = x
+        self.y = y
+
+    def set_pixel_position(self: 'Camera', x: float, y: float) -> None:
+        ''' Put the camera's tile (see get_rect()) at map pixel x,y.
+
+        The position is rounded to the nearest screen pixel at the current
+        scale; set it again after changing the scale.
+        '''
+        self.x = math.floor(x / self.map.tile_width)
+        self.y = math.floor(y / self.map.tile_height)
+        self.offset_x = round(self.x * self.map.tile_width * self.scale) - round(x * self.scale)
+        self.offset_y = round(self.y * self.map.tile_height * self.scale) - round(y * self.scale)
+
+    def set_edge(self: 'Camera', edge: int) -> None:
+        ''' Set the Tiled GID drawn outside the map.
+
+        A packed map only has the tiles it uses, so pass the edge GID in its
+        *keep* if it doesn't appear in the map itself.
+        '''
+        edge_tile = self.map.tile_id(edge)
+        if edge_tile == 0 and edge != 0:
+            raise ValueError('Edge tile {0} is not in the map; pack it with keep=({0},)'.format(edge))
+
+        self.edge_tile = edge_tile
+        self.edge_surface = None
+
+        # Prescaled chunks have the old edge baked in.
+        self.zoom_levels.clear()
+        self.warm_queue.clear()
+        if self.zoom is not None:
+            self.zoom = self.get_zoom_level(self.scale, self.scale_algo)
+
+    def set_scale(self: 'Camera', scale: float, algorithm: callable = None) -> None:
+        ''' Set view scaling.
+
+        Any positive *scale* works; *algorithm* is a pygame.transform function
+        (scale() if it's None), and is ignored at 1x. Chunks are scaled the
+        first time they're drawn at a new zoom level, so warm() the levels
+        you're going to use to avoid a hitch.
+        '''
+        if scale <= 0:
+            raise ValueError('Scale must be positive: {0}'.format(scale))
+
+        self.scale = scale
+        self.scale_algo = algorithm
+        self.zoom = None if scale == 1 else self.get_zoom_level(scale, algorithm)
+
+        if self.viewport is not None:
+            self.set_viewport(self.viewport)  # The number of visible tiles changed.
+
+    def get_zoom_level(self: 'Camera', scale: float, algorithm: callable) -> ZoomLevel:
+        key = (scale, algorithm or pygame.transform.scale)
+        level = self.zoom_levels.get(key)
+        if level is not None:
+            self.zoom_levels.move_to_end(key)
+            return level
+
+        level = ZoomLevel(self.map, key[0], key[1])
+        self.zoom_levels[key] = level
+        if len(self.zoom_levels) > ZOOM_LEVELS:
+            self.zoom_levels.popitem(last=False)
+
+        return level
+
+    def warm(self: 'Camera', scale: float, algorithm: callable = None, layers: list = None) -> None:
+        ''' Queue up the chunks around the camera at another zoom level.
+
+        They're prescaled a few at a time during update(), so switching to
+        that level later doesn't stall. *layers* defaults to all of them.
+        '''
+        if scale == 1:
+            return
+
+        level = self.get_zoom_level(scale, algorithm)
+        if layers is None:
+            layers = self.map.layer_names
+
+        # One extra chunk all around, in case the camera moves.
+        view = self.get_view(scale).inflate(2 * CHUNK_PIXELS, 2 * CHUNK_PIXELS)
+        for layer in layers:
+            for cy in level.chunk_span(view.y, view.height, self.map.tile_height):
+                for cx in level.chunk_span(view.x, view.width, self.map.tile_width):
+                    self.warm_queue.append((level, layer, cx, cy))
+
+    def update(self: 'Camera', dt: float) -> None:
+        ''' Advance the map's tile animations, fixing up any prescaled chunks
+        showing them, then spend up to WARM_TIME seconds on warm()'s queue.
+        '''
+        changed = self.map.update(dt)
+        if changed and self.zoom_levels:
+            changed = set(changed)
+            for layer, cells in self.map.animated_cells.items():
+                data = self.map.layer_data[layer]
+                for i in cells:
+                    if data[i] & GID_MASK in changed:
+                        for level in self.zoom_levels.values():
+                            level.redraw_cell(layer, i % self.map.map_width, i // self.map.map_width)
+
+            # The edge is baked into whole chunks; rebuild them as they're drawn.
+            if self.edge_tile & GID_MASK in changed:
+                for level in self.zoom_levels.values():
+                    level.drop_edge_chunks()
+
+        deadline = time.perf_counter() + WARM_TIME
+        while self.warm_queue and time.perf_counter() < deadline:
+            level, layer, cx, cy = self.warm_queue.popleft()
+            if self.zoom_levels.get(level.key) is level:  # Not dropped since.
+                level.get_chunk(layer, cx, cy, self.edge_tile)
+
+    def get_anchor(self: 'Camera', scale: float) -> tuple:
+        ''' Where the camera's tile is drawn, relative to the viewport.
+        '''
+        tile_w = self.map.tile_width * scale
+        tile_h = self.map.tile_height * scale
+
+        return (round(math.ceil(self.viewport.width / tile_w) // 2 * tile_w),
+                round(math.ceil(self.viewport.height / tile_h) // 2 * tile_h))
+
+    def get_view(self: 'Camera', scale: float) -> pygame.Rect:
+        ''' The part of the map in the viewport, in *scaled* map pixels.
+        '''
+        anchor_x, anchor_y = self.get_anchor(scale)
+
+        return pygame.Rect(round(self.x * self.map.tile_width * scale) - anchor_x - self.offset_x,
+                           round(self.y * self.map.tile_height * scale) - anchor_y - self.offset_y,
+                           self.viewport.width, self.viewport.height)
+
+    def to_screen(self: 'Camera', x: float, y: float) -> tuple:
+        ''' Convert map pixel x,y to screen pixels.
+        '''
+        view = self.get_view(self.scale)
+
+        return (self.viewport.x + round(x * self.scale) - view.x, self.viewport.y + round(y * self.scale) - view.y)
+
+    def get_rect(self: 'Camera') -> pygame.Rect:
+        ''' Get the rectangle representing the camera position in screen pixels.
+        '''
+        anchor_x, anchor_y = self.get_anchor(self.scale)
+
+        return pygame.Rect(self.viewport.x + anchor_x, self.viewport.y + anchor_y,
+                           round(self.map.tile_width * self.scale), round(self.map.tile_height * self.scale))
+
+    @trace.traced
+    def draw(self: 'Camera', layer: str) -> None:
+        if self.zoom is not None:
+            self.draw_zoomed(layer)
+            return
+
+        tile_w = self.map.tile_width
+        tile_h = self.map.tile_height
+        view = self.get_view(1)
+
+        # Where the map's top-left corner is on screen.
+        map_x = self.viewport.x - view.x
+        map_y = self.viewport.y - view.y
+
+        # The visible cells that are actually on the map; everything else is
+        # edge.
+        first_x = max(0, view.left // tile_w)
+        first_y = max(0, view.top // tile_h)
+        last_x = min(self.map.map_width, -(-view.right // tile_w))
+        last_y = min(self.map.map_height, -(-view.bottom // tile_h))
+        cells = pygame.Rect(first_x, first_y, max(0, last_x - first_x), max(0, last_y - first_y))
+
+        clip = self.screen.get_clip()
+        self.screen.set_clip(self.viewport)
+        if self.edge_tile != 0:
+            self.draw_edges(pygame.Rect(map_x, map_y, self.map.map_width * tile_w, self.map.map_height * tile_h))
+        if cells.width > 0 and cells.height > 0:
+            self.map.render(layer, self.screen, cells, map_x + cells.x * tile_w, map_y + cells.y * tile_h)
+        self.screen.set_clip(clip)
+
+    def draw_edges(self: 'Camera', map_rect: pygame.Rect) -> None:
+        ''' Fill the parts of the viewport outside *map_rect* (in screen
+        pixels) with the edge tile.
+        '''
+        inside = map_rect.clip(self.viewport)
+        if inside == self.viewport:
+            return
+
+        if inside.width == 0 or inside.height == 0:
+            strips = [self.viewport]
+        else:
+            strips = [
+                pygame.Rect(self.viewport.x, self.viewport.y, self.viewport.width, inside.y - self.viewport.y),
+                pygame.Rect(self.viewport.x, inside.bottom, self.viewport.width, self.viewport.bottom - inside.bottom),
+                pygame.Rect(self.viewport.x, inside.y, inside.x - self.viewport.x, inside.height),
+                pygame.Rect(inside.right, inside.y, self.viewport.right - inside.right, inside.height),
+            ]
+
+        edges = self.get_edge_surface()
+        tile_w = self.map.tile_width
+        tile_h = self.map.tile_height
+        self.screen.blits([(edges, strip, pygame.Rect((strip.x - map_rect.x) % tile_w, (strip.y - map_rect.y) % tile_h,
+                                                      strip.width, strip.height))
+                           for strip in strips if strip.width > 0 and strip.height > 0], doreturn=False)
+
+    def get_edge_surface(self: 'Camera') -> pygame.Surface:
+        ''' A viewport-sized (plus a tile) surface tiled with the edge tile.
+        '''
+        size = (self.viewport.width + self.map.tile_width, self.viewport.height + self.map.tile_height)
+        frame = self.map.get_frame_id(self.edge_tile)  # The edge might be animated.
+        if self.edge_surface is not None and self.edge_surface.get_size() == size and self.edge_frame == frame:
+            return self.edge_surface
+
+        tile = self.map.get_tile_texture(self.edge_tile)
+        self.edge_frame = frame
+
+        # The surface starts out fully transparent, so BLEND_RGBA_MAX copies
+        # the tile exactly.
+        self.edge_surface = pygame.Surface(size, pygame.SRCALPHA, 32)
+        self.edge_surface.blits([(tile, (x, y), None, pygame.BLEND_RGBA_MAX)
+                                 for y in range(0, size[1], self.map.tile_height)
+                                 for x in range(0, size[0], self.map.tile_width)], doreturn=False)
+        self.edge_surface = self.edge_surface.convert_alpha()
+
+        return self.edge_surface
+
+    def draw_zoomed(self: 'Camera', layer: str) -> None:
+        level = self.zoom
+        view = self.get_view(self.scale)
+
+        batch = []
+        for cy in level.chunk_span(view.y, view.height, self.map.tile_height):
+            for cx in level.chunk_span(view.x, view.width, self.map.tile_width):
+                rect = level.chunk_rect(cx, cy)
+                dest = (self.viewport.x + rect.x - view.x, self.viewport.y + rect.y - view.y)
+                batch.append((level.get_chunk(layer, cx, cy, self.edge_tile), dest, None, pygame.BLEND_PREMULTIPLIED))
+
+        clip = self.screen.get_clip()
+        self.screen.set_clip(self.viewport)
+        self.screen.blits(batch, doreturn=False)
+        self.screen.set_clip(clip)
@@ -0,0 +1,150 @@
+# Engine - Tile layer compositor
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Drawing a map one layer at a time blits every visible cell once per layer,
+# every frame. Layers that never change can be flattened together once, at
+# load time, into chunks; then each frame only needs a blit per visible chunk.
+#
+# Blending tiles onto a transparent chunk leaves it holding straight alpha,
+# so each chunk is converted to premultiplied alpha (colour already
+# multiplied by alpha) once it's built. That lets them be drawn with
+# BLEND_PREMULTIPLIED and still come out the same as drawing the layers one
+# by one.
+
+import pygame
+
+from . import trace
+from .tilemap import GID_MASK, Map
+
+CHUNK_SIZE = 8  # In tiles; 256x256 pixels with 32x32 tiles.
+
+
+class LayerCompositor:
+    ''' Draw a Map's tile layers, pre-merging the static ones.
+
+    Layers with a true "dynamic" property in Tiled, or named in *dynamic*, are
+    drawn live with Map.render(). Runs of static layers between them are
+    flattened into cached chunks of *chunk_size* x *chunk_size* tiles. Mark a
+    layer dynamic if sprites have to be drawn between it and the layers around
+    it, then use render_group() to draw the groups with sprites in between.
+    '''
+    def __init__(self: 'LayerCompositor', the_map: Map, layers: list = None, dynamic: tuple = (),
+                 chunk_size: int = CHUNK_SIZE) -> None:
+        self.map = the_map
+        self.chunk_width = chunk_size * the_map.tile_width  # Pixels.
+        self.chunk_height = chunk_size * the_map.tile_height
+        self.map_rect = pygame.Rect(0, 0, the_map.map_width * the_map.tile_width,
+                                    the_map.map_height * the_map.tile_height)
+
+        if layers is None:
+            layers = the_map.layer_names
+
+        # Each group is ([layer names], chunks); chunks is None for a dynamic
+        # layer, otherwise {(chunk x, chunk y): Surface}.
+        self.groups = []
+        for name in layers:
+            if name in dynamic or the_map.layer_properties.get(name, {}).get('dynamic') == 'true':
+                self.groups.append(([name], None))
+            elif self.groups and self.groups[-1][1] is not None:
+                self.groups[-1][0].append(name)
+            else:
+                self.groups.append(([name], {}))
+
+        for group_layers, chunks in self.groups:
+            if chunks is not None:
+                self.build_chunks(group_layers, chunks)
+
+    def build_chunks(self: 'LayerCompositor', layers: list, chunks: dict) -> None:
+        chunks_x = -(-self.map_rect.width // self.chunk_width)
+        chunks_y = -(-self.map_rect.height // self.chunk_height)
+        for cy in range(chunks_y):
+            for cx in range(chunks_x):
+                chunk = pygame.Surface((self.chunk_width, self.chunk_height), pygame.SRCALPHA, 32).convert_alpha()
+                chunk.fill((0, 0, 0, 0))
+
+                viewport = pygame.Rect(cx * self.chunk_width // self.map.tile_width,
+                                       cy * self.chunk_height // self.map.tile_height,
+                                       self.chunk_width // self.map.tile_width,
+                                       self.chunk_height // self.map.tile_height)
+                for layer in layers:
+                    self.map.render(layer, chunk, viewport)
+
+                chunks[(cx, cy)] = chunk.premul_alpha()
+
+    def update(self: 'LayerCompositor', dt: float) -> None:
+        ''' Advance the map's tile animations, and redraw any merged cells
+        that are showing a new frame.
+        '''
+        changed = self.map.update(dt)
+        if not changed:
+            return
+
+        changed = set(changed)
+        for layers, chunks in self.groups:
+            if chunks is None:
+                continue  # Drawn live anyway.
+
+            cells = set()
+            for layer in layers:
+                data = self.map.layer_data[layer]
+                cells.update(i for i in self.map.animated_cells.get(layer, ()) if data[i] & GID_MASK in changed)
+
+            for i in cells:
+                self.redraw_cell(layers, chunks, i % self.map.map_width, i // self.map.map_width)
+
+    def redraw_cell(self: 'LayerCompositor', layers: list, chunks: dict, x: int, y: int) -> None:
+        tile_w = self.map.tile_width
+        tile_h = self.map.tile_height
+        chunk = chunks[(x * tile_w // self.chunk_width, y * tile_h // self.chunk_height)]
+        target = pygame.Rect(x * tile_w % self.chunk_width, y * tile_h % self.chunk_height, tile_w, tile_h)
+
+        # Merge the cell the same way build_chunks() does, then premultiply it.
+        cell = pygame.Surface(target.size, pygame.SRCALPHA, 32).convert_alpha()
+        cell.fill((0, 0, 0, 0))
+        for layer in layers:
+            tile = self.map.get_tile_texture(self.map.get_tile(layer, x, y))
+            if tile is not None:
+                cell.blit(tile, (0, 0))
+
+        chunk.fill((0, 0, 0, 0), target)
+        chunk.blit(cell.premul_alpha(), target, special_flags=pygame.BLEND_PREMULTIPLIED)
+
+    @trace.traced
+    def render(self: 'LayerCompositor', surface: pygame.Surface, viewport: pygame.Rect, offset_x: int = 0,
+               offset_y: int = 0) -> None:
+        ''' Draw every group on *surface*.
+
+        The *viewport* is in *tile* co-ordinates, the offsets are in pixels,
+        same as Map.render().
+        '''
+        for i in range(len(self.groups)):
+            self.render_group(i, surface, viewport, offset_x, offset_y)
+
+    def render_group(self: 'LayerCompositor', index: int, surface: pygame.Surface, viewport: pygame.Rect,
+                     offset_x: int = 0, offset_y: int = 0) -> None:
+        layers, chunks = self.groups[index]
+        if chunks is None:
+            self.map.render(layers[0], surface, viewport, offset_x, offset_y)
+            return
+
+        # The part of the map we're showing, in map pixels.
+        origin_x = viewport.x * self.map.tile_width
+        origin_y = viewport.y * self.map.tile_height
+        view = pygame.Rect(origin_x, origin_y, viewport.width * self.map.tile_width,
+                           viewport.height * self.map.tile_height).clip(self.map_rect)
+        if view.width == 0 or view.height == 0:
+            return
+
+        batch = []
+        for cy in range(view.top // self.chunk_height, (view.bottom - 1) // self.chunk_height + 1):
+            for cx in range(view.left // self.chunk_width, (view.right - 1) // self.chunk_width + 1):
+                chunk_rect = pygame.Rect(cx * self.chunk_width, cy * self.chunk_height, self.chunk_width,
+                                         self.chunk_height)
+                area = chunk_rect.clip(view)
+                dest = (offset_x + area.x - origin_x, offset_y + area.y - origin_y)
+                area.move_ip(-chunk_rect.x, -chunk_rect.y)
+                batch.append((chunks[(cx, cy)], dest, area, pygame.BLEND_PREMULTIPLIED))
+
+        surface.blits(batch, doreturn=False)
@@ -0,0 +1,164 @@
+# Engine - Keyword conversations
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Ultima-style conversations: the player types a keyword and the NPC
+# answers. Each NPC's dialogue is a JSON file; a directory of them is
+# compiled into Scripts with a sorted keyword index, so partial keywords and
+# auto-complete are a binary search. The compiled Scripts are pickled into
+# the directory's __pycache__ and reused until their files change, so a game
+# with lots of NPCs doesn't parse them all every time it starts.
+
+import bisect
+import json
+import os
+import pickle
+
+DIALOGUE_CACHE = 'dialogue.pickle'
+DIALOGUE_CACHE_VERSION = 1
+UNKNOWN_TOPIC = "I don't know anything about {0}."
+
+
+class Script:
+    ''' One NPC's compiled dialogue.
+
+    *responses* maps each KEYWORD to (answer, keywords it unlocks);
+    *topics* are the keywords you can ask about from the start.
+    '''
+    def __init__(self: 'Script', name: str, greeting: str, unknown: str, responses: dict, topics: tuple) -> None:
+        self.name = name
+        self.greeting = greeting
+        self.unknown = unknown
+        self.responses = responses
+        self.topics = topics
+        self.keywords = sorted(responses)  # The prefix index.
+
+    def find(self: 'Script', prefix: str) -> list:
+        ''' Every keyword starting with *prefix*, in order.
+        '''
+        start = bisect.bisect_left(self.keywords, prefix)
+        end = bisect.bisect_left(self.keywords, prefix + '\uffff', start)
+
+        return self.keywords[start:end]
+
+
+def compile_topics(topics: dict, responses: dict) -> tuple:
+    ''' Add *topics* (and their sub-topics) to *responses*; returns the
+    top-level keywords.
+    '''
+    keywords = []
+    for keyword, response in topics.items():
+        keyword = keyword.strip().upper()
+        if isinstance(response, str):
+            answer = response
+            unlocks = ()
+        else:
+            answer = response['text']
+            unlocks = compile_topics(response.get('topics', {}), responses)
+
+        responses[keyword] = (answer, unlocks)
+        keywords.append(keyword)
+
+    return tuple(keywords)
+
+
+def compile_script(path: str) -> Script:
+    ''' Compile the dialogue file at *path*.
+
+    The file is a JSON object with a "name", an optional "greeting" and
+    "unknown" answer (with {0} for the question), and "topics": KEYWORD ->
+    answer. An answer can also be {"text": answer, "topics": {...}}; its
+    topics can only be asked about once it's been given.
+    '''
+    with open(path, encoding='utf-8') as dialogue_file:
+        data = json.load(dialogue_file)
+
+    try:
+        responses = {}
+        topics = compile_topics(data['topics'], responses)
+        return Script(data['name'], data.get('greeting', ''), data.get('unknown', UNKNOWN_TOPIC), responses, topics)
+    except (KeyError, TypeError, AttributeError) as ex:
+        raise ValueError('Bad dialogue in {0}: {1!r}'.format(path, ex))
+
+
+def load_dialogue(directory: str, cache: bool = True) -> dict:
+    ''' Compile every .json dialogue file in *directory*.
+
+    Returns a dict of file name (without .json) -> Script. With *cache*
+    set, the Scripts are kept in a pickle in the directory's __pycache__;
+    only files that have been added or changed since are compiled. Like
+    .pyc files, only use caches you made yourself.
+    '''
+    cache_path = os.path.join(directory, '__pycache__', DIALOGUE_CACHE)
+    cached = {}  # name -> (mtime, size, Script)
+    if cache:
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                compiled = pickle.load(cache_file)
+            if compiled['version'] == DIALOGUE_CACHE_VERSION:
+                cached = compiled['scripts']
+        except Exception:
+            pass  # Missing, unreadable or from an older version; rebuild it.
+
+    scripts = {}
+    changed = False
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+
+        path = os.path.join(directory, name)
+        info = os.stat(path)
+        entry = cached.get(name)
+        if entry is None or entry[:2] != (info.st_mtime_ns, info.st_size):
+            entry = (info.st_mtime_ns, info.st_size, compile_script(path))
+            changed = True
+        scripts[name] = entry
+
+    if cache and (changed or len(scripts) != len(cached)):
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'wb') as cache_file:
+                pickle.dump({'version': DIALOGUE_CACHE_VERSION, 'scripts': scripts}, cache_file, pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass  # Read-only install; we'll just compile again next time.
+
+    return {name[:-len('.json')]: entry[2] for name, entry in scripts.items()}
+
+
+class Conversation:
+    ''' A conversation with the NPC whose dialogue is *script*.
+
+    Keeps track of which keywords have been unlocked so far. Questions can
+    be abbreviated to any prefix that only matches one known keyword.
+    '''
+    def __init__(self: 'Conversation', script: Script) -> None:
+        self.script = script
+        self.known = set(script.topics)
+
+    def complete(self: 'Conversation', prefix: str) -> list:
+        ''' Known keywords starting with *prefix*, for auto-complete.
+        '''
+        return [keyword for keyword in self.script.find(prefix.strip().upper()) if keyword in self.known]
+
+    def match(self: 'Conversation', question: str) -> str:
+        ''' The keyword *question* asks about, or None.
+        '''
+        question = question.strip().upper()
+        if question in self.known:
+            return question
+
+        matches = self.complete(question) if question else []
+        return matches[0] if len(matches) == 1 else None
+
+    def ask(self: 'Conversation', question: str) -> str:
+        ''' The NPC's answer to *question*.
+        '''
+        keyword = self.match(question)
+        if keyword is None:
+            return self.script.unknown.format(question.strip())
+
+        answer, unlocks = self.script.responses[keyword]
+        self.known.update(unlocks)
+
+        return answer
@@ -0,0 +1,104 @@
+# Engine - Smooth camera following
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Game logic runs in fixed steps so it behaves the same at any frame rate.
+# Frames get drawn whenever they get drawn, so the camera is placed part way
+# between the last two steps; that keeps scrolling smooth on any display
+# without having to run the logic faster.
+
+import math
+
+from .camera import Camera
+
+
+class FixedStep:
+    ''' Turn variable frame times into a whole number of fixed *step*s.
+    '''
+    def __init__(self: 'FixedStep', step: float = 1 / 60, max_steps: int = 5) -> None:
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0  # seconds not used up by a step yet
+
+    def advance(self: 'FixedStep', dt: float) -> int:
+        ''' Add *dt* seconds, and return how many steps to run.
+
+        After a long stall only *max_steps* are run, so we don't spend the
+        next frame catching up on the last one, and so on.
+        '''
+        self.accumulator += dt
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator = self.accumulator % self.step
+        else:
+            self.accumulator -= steps * self.step
+
+        return steps
+
+    def alpha(self: 'FixedStep') -> float:
+        ''' How far we are between the last step and the next one, 0 to 1.
+        '''
+        return self.accumulator / self.step
+
+
+class Follow:
+    ''' Move a Camera smoothly after a target.
+
+    Positions are floats, in map pixels. The target can wander around a
+    *dead_zone* (width, height) box in the middle of the view without the
+    camera moving; once it leaves the box, the camera eases after it, with
+    *stiffness* setting how quickly (higher is snappier).
+
+    Call step() once per fixed update step, and apply() before drawing.
+    '''
+    def __init__(self: 'Follow', camera: Camera, dead_zone: tuple = (0, 0), stiffness: float = 8.0) -> None:
+        self.camera = camera
+        self.dead_zone = dead_zone
+        self.stiffness = stiffness
+
+        self.x = 0.0
+        self.y = 0.0
+        self.previous_x = 0.0
+        self.previous_y = 0.0
+        self.target_x = 0.0
+        self.target_y = 0.0
+
+    def set_target(self: 'Follow', x: float, y: float) -> None:
+        self.target_x = x
+        self.target_y = y
+
+    def snap(self: 'Follow') -> None:
+        ''' Jump straight to the target, with no easing.
+        '''
+        self.x = self.previous_x = self.target_x
+        self.y = self.previous_y = self.target_y
+
+    def step(self: 'Follow', dt: float) -> None:
+        ''' Move towards the target for one fixed step of *dt* seconds.
+        '''
+        self.previous_x = self.x
+        self.previous_y = self.y
+
+        # Frame-rate independent exponential easing.
+        amount = 1 - math.exp(-self.stiffness * dt)
+        self.x += (self.chase(self.x, self.target_x, self.dead_zone[0] / 2) - self.x) * amount
+        self.y += (self.chase(self.y, self.target_y, self.dead_zone[1] / 2) - self.y) * amount
+
+    def chase(self: 'Follow', position: float, target: float, slack: float) -> float:
+        # Where to go so the target's just inside the dead zone.
+        if target > position + slack:
+            return target - slack
+        elif target < position - slack:
+            return target + slack
+
+        return position
+
+    def apply(self: 'Follow', alpha: float = 1.0) -> None:
+        ''' Position the camera *alpha* of the way from the previous step to
+        the current one, centred on the tile it's following.
+        '''
+        x = self.previous_x + (self.x - self.previous_x) * alpha
+        y = self.previous_y + (self.y - self.previous_y) * alpha
+        self.camera.set_pixel_position(x - self.camera.map.tile_width / 2, y - self.camera.map.tile_height / 2)
@@ -0,0 +1,131 @@
+# Engine - Background asset loader
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# PNG decoding and TMX parsing/decompression happen on a thread pool. Anything
+# that needs the display (convert_alpha(), building a Map's subsurfaces) has to
+# happen on the main thread, so call poll() once per frame to finish off
+# whatever's ready.
+
+import os
+import pygame
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .assets import AssetManager, assets
+from .tilemap import Map, parse_map
+
+
+class Loader:
+    ''' Load images and maps in the background.
+
+    Each load_*() method returns a concurrent.futures.Future that gets its
+    result during a later poll(). Images end up in the shared asset cache, so
+    anything that calls load_image() afterwards gets them for free.
+    '''
+    def __init__(self: 'Loader', manager: AssetManager = assets, workers: int = 2) -> None:
+        self.assets = manager
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='loader')
+
+        self.pending = []  # (worker future, finisher, our future)
+        self.total = 0
+        self.finished = 0
+
+    def submit(self: 'Loader', work: callable, finish: callable, *args) -> Future:
+        future = Future()
+        self.pending.append((self.pool.submit(work, *args), finish, future))
+        self.total += 1
+
+        return future
+
+    def load_image(self: 'Loader', path: str, mode: str = 'alpha') -> Future:
+        ''' Decode the image at *path* in the background.
+
+        The Future's result is the converted Surface.
+        '''
+        key = ('image', os.path.abspath(path), mode)
+        if key in self.assets.cache:
+            return self.submit(lambda: None, lambda _: self.assets.image(path, mode))
+
+        return self.submit(pygame.image.load, lambda surface: self.store_image(key, surface, mode), path)
+
+    def load_map(self: 'Loader', map_path: str, map_class: type = Map, **kwargs) -> Future:
+        ''' Parse the map at *map_path* (and decode its tileset images) in the
+        background.
+
+        The Future's result is a *map_class* instance; *kwargs* are passed to
+        its constructor.
+        '''
+        return self.submit(self.parse_map, lambda parsed: self.finish_map(map_class, map_path, parsed, kwargs),
+                           map_path)
+
+    def parse_map(self: 'Loader', map_path: str) -> dict:
+        # Runs on a worker thread; only decode images nobody's loaded yet.
+        parsed = parse_map(map_path)
+        for tileset in parsed['tilesets']:
+            if ('image', os.path.abspath(tileset['image_path']), 'alpha') not in self.assets.cache:
+                tileset['image'] = pygame.image.load(tileset['image_path'])
+
+        return parsed
+
+    def finish_map(self: 'Loader', map_class: type, map_path: str, parsed: dict, kwargs: dict) -> Map:
+        # Packed or not, the Map gets its tileset images from the cache.
+        for tileset in parsed['tilesets']:
+            if tileset['image'] is not None:
+                key = ('image', os.path.abspath(tileset['image_path']), 'alpha')
+                self.store_image(key, tileset['image'], 'alpha')
+                tileset['image'] = None  # Don't hang on to the unconverted copy.
+
+        return map_class(map_path, parsed, **kwargs)
+
+    def store_image(self: 'Loader', key: tuple, surface: pygame.Surface, mode: str) -> pygame.Surface:
+        if key in self.assets.cache:  # Someone else got there first.
+            return self.assets.image(key[1], mode)
+
+        return self.assets.store(key, self.assets.convert(surface, mode))
+
+    def poll(self: 'Loader') -> int:
+        ''' Finish off any loads that the workers are done with.
+
+        Call this from the main thread, once per frame. Returns the number of
+        loads finished.
+        '''
+        count = 0
+        still_pending = []
+        for work, finish, future in self.pending:
+            if not work.done():
+                still_pending.append((work, finish, future))
+                continue
+
+            try:
+                future.set_result(finish(work.result()))
+            except Exception as ex:
+                future.set_exception(ex)
+            count += 1
+
+        self.pending = still_pending
+        self.finished += count
+
+        return count
+
+    def wait(self: 'Loader') -> None:
+        ''' Block until everything submitted so far has loaded.
+        '''
+        while self.pending:
+            self.pending[0][0].exception()  # Wait without raising.
+            self.poll()
+
+    def done(self: 'Loader') -> bool:
+        return not self.pending
+
+    def progress(self: 'Loader') -> float:
+        ''' Percentage of submitted loads that have finished.
+        '''
+        if self.total == 0:
+            return 100.0
+
+        return 100.0 * self.finished / self.total
+
+    def shutdown(self: 'Loader') -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,141 @@
+# Engine - Minimaps generated from map data
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Every tile's average colour is worked out once, then the minimap is one
+# NumPy lookup of those colours by tile ID. pygame.surfarray needs NumPy
+# anyway.
+
+import numpy
+import pygame
+import pygame.surfarray
+
+from .tilemap import GID_MASK, Map
+
+
+def average_colours(tiles: list, wanted: set = None) -> numpy.ndarray:
+    ''' Average colour of each tile in *tiles*, as an (N, 4) RGBA array.
+
+    Colours are weighted by alpha, and the alpha is the tile's average
+    opacity. Missing (None) tiles are fully transparent, and so are tiles
+    whose index isn't in *wanted*, if it's given. Tiles are grouped by the
+    texture they're subsurfaces of, and each texture is averaged a row of
+    tiles at a time.
+    '''
+    colours = numpy.zeros((len(tiles), 4), dtype=numpy.uint8)
+    if wanted is None:
+        wanted = range(len(tiles))
+
+    by_texture = {}
+    for idx in wanted:
+        tile = tiles[idx]
+        if tile is not None:
+            texture = tile.get_parent() or tile
+            by_texture.setdefault(id(texture), (texture, []))[1].append(idx)
+
+    for texture, indexes in by_texture.values():
+        tile_w, tile_h = tiles[indexes[0]].get_size()
+        offsets = [tiles[idx].get_offset() if tiles[idx].get_parent() else (0, 0) for idx in indexes]
+        grid = texture_colours(texture, tile_w, tile_h, {y // tile_h for _, y in offsets})
+        for idx, (x, y) in zip(indexes, offsets):
+            colours[idx] = grid[x // tile_w, y // tile_h]
+
+    return colours
+
+
+def texture_colours(texture: pygame.Surface, tile_w: int, tile_h: int, rows: set = None) -> numpy.ndarray:
+    ''' Average RGBA colour of every *tile_w* x *tile_h* cell in *texture*.
+
+    Only the given *rows* of tiles are worked out, if you pass them.
+    '''
+    columns = texture.get_width() // tile_w
+    grid = numpy.zeros((columns, texture.get_height() // tile_h, 4), dtype=numpy.uint8)
+    if rows is None:
+        rows = range(grid.shape[1])
+
+    rgb = pygame.surfarray.pixels3d(texture)
+    alpha = pygame.surfarray.pixels_alpha(texture) if texture.get_flags() & pygame.SRCALPHA else None
+    for row in rows:
+        # Integer maths; 255 * 255 * a 64x64 tile still fits in 32 bits.
+        strip = rgb[:columns * tile_w, row * tile_h:(row + 1) * tile_h].reshape(columns, tile_w * tile_h, 3)
+        strip = strip.astype(numpy.uint32)
+        if alpha is None:
+            grid[:, row, :3] = strip.sum(axis=1) // (tile_w * tile_h)
+            grid[:, row, 3] = 255
+            continue
+
+        weights = alpha[:columns * tile_w, row * tile_h:(row + 1) * tile_h].reshape(columns, tile_w * tile_h)
+        weights = weights.astype(numpy.uint32)
+        totals = weights.sum(axis=1)
+        grid[:, row, :3] = (strip * weights[:, :, None]).sum(axis=1) // numpy.maximum(totals, 1)[:, None]
+        grid[:, row, 3] = totals // (tile_w * tile_h)
+    del rgb, alpha  # Unlock the texture.
+
+    return grid
+
+
+class Minimap:
+    ''' A minimap of *layers* (default: all of them) of *the_map*.
+
+    Each tile is a *scale* x *scale* block of pixels; the upper layer wins
+    wherever it has a tile. Call update_cell() after changing a tile to fix
+    just that part of the minimap.
+    '''
+    def __init__(self: 'Minimap', the_map: Map, layers: list = None, scale: int = 1) -> None:
+        self.map = the_map
+        self.layers = the_map.layer_names if layers is None else layers
+        self.scale = scale
+
+        # Only the tiles the map uses; others are added as they show up.
+        used = set()
+        for layer in self.layers:
+            used.update(gid & GID_MASK for gid in the_map.layer_data[layer])
+        self.colours = average_colours(the_map.tiles, used)
+        self.known = numpy.zeros(len(the_map.tiles), dtype=bool)
+        self.known[list(used)] = True
+        self.surface = pygame.Surface((the_map.map_width * scale, the_map.map_height * scale), pygame.SRCALPHA, 32)
+        self.surface = self.surface.convert_alpha()
+        self.redraw()
+
+    def redraw(self: 'Minimap') -> None:
+        ''' Regenerate the whole minimap.
+        '''
+        width = self.map.map_width
+        height = self.map.map_height
+
+        ids = numpy.zeros(width * height, dtype=numpy.uint32)
+        for layer in self.layers:
+            layer_ids = numpy.asarray(self.map.layer_data[layer], dtype=numpy.uint32) & GID_MASK
+            ids = numpy.where(layer_ids != 0, layer_ids, ids)
+
+        # layer_data is in rows, surfarray wants columns.
+        pixels = self.colours[ids].reshape(height, width, 4).transpose(1, 0, 2)
+        if self.scale > 1:
+            pixels = pixels.repeat(self.scale, axis=0).repeat(self.scale, axis=1)
+
+        pygame.surfarray.blit_array(self.surface, pixels[:, :, :3])
+        alpha = pygame.surfarray.pixels_alpha(self.surface)
+        alpha[:] = pixels[:, :, 3]
+        del alpha  # Unlock the surface.
+
+    def update_cell(self: 'Minimap', x: int, y: int) -> None:
+        ''' Redraw the minimap pixels for map cell x,y.
+        '''
+        tile_id = 0
+        for layer in self.layers:
+            layer_id = self.map.get_tile(layer, x, y) & GID_MASK
+            if layer_id != 0:
+                tile_id = layer_id
+
+        if not self.known[tile_id]:
+            self.colours[tile_id] = average_colours(self.map.tiles, {tile_id})[tile_id]
+            self.known[tile_id] = True
+
+        self.surface.fill(self.colours[tile_id], pygame.Rect(x * self.scale, y * self.scale, self.scale, self.scale))
+
+    def get_view_rect(self: 'Minimap', viewport: pygame.Rect) -> pygame.Rect:
+        ''' Convert a *viewport* in tiles into minimap pixels.
+        '''
+        return pygame.Rect(viewport.x * self.scale, viewport.y * self.scale, viewport.width * self.scale,
+                           viewport.height * self.scale)
@@ -0,0 +1,159 @@
+# Engine - Text with inline markup
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Markup is parsed once, when text is added, into runs of plain text with a
+# style and colours. The runs are laid out and rendered (through the
+# TextCache) at the same time, so drawing a page is a few fills and one
+# blits() call; nothing is parsed, measured or rasterized per frame.
+
+import pygame
+import pygame.freetype
+import re
+
+from .text import text_cache, TextCache
+
+WHITE = pygame.Color('white')
+
+# {name}, {/name} or {name=value}
+MARKUP_TAG = re.compile(r'{(/?)([a-z]+)(?:=([^}]*))?}')
+WHITESPACE = re.compile(r'(\s+)')
+
+MARKUP_COLORS = ('color', 'bg')
+MARKUP_STYLES = {
+    'o': pygame.freetype.STYLE_OBLIQUE,
+    's': pygame.freetype.STYLE_STRONG,
+    'u': pygame.freetype.STYLE_UNDERLINE,
+}
+
+
+def parse_markup(text: str, fgcolor: pygame.Color = WHITE, bgcolor: pygame.Color = None) -> list:
+    ''' Split *text* into (text, style, fgcolor, bgcolor) runs.
+
+    Tags are {color=#rrggbb}...{/color}, {bg=#rrggbb}...{/bg}, and {s}, {o}
+    and {u} for strong, oblique and underlined text. Tags nest in any order
+    and can span words; a closing tag ends the innermost span of its own
+    kind. Anything else in braces is left in the text.
+    '''
+    colors = {'color': [fgcolor], 'bg': [bgcolor]}
+    style = pygame.freetype.STYLE_NORMAL
+    style_counts = dict.fromkeys(MARKUP_STYLES, 0)
+
+    runs = []
+    start = 0
+    for match in MARKUP_TAG.finditer(text):
+        closing, name, value = match.groups()
+        if name in MARKUP_COLORS:
+            stack = colors[name]
+            if closing:
+                known = value is None and len(stack) > 1
+            elif value is None:
+                known = False
+            else:
+                try:
+                    color = pygame.Color(value)
+                    known = True
+                except ValueError:  # Not a colour pygame knows.
+                    known = False
+        elif name in MARKUP_STYLES:
+            known = value is None and (not closing or style_counts[name] > 0)
+        else:
+            known = False
+        if not known:
+            continue  # Not a tag we know; it's just text.
+
+        if match.start() > start:
+            runs.append((text[start:match.start()], style, colors['color'][-1], colors['bg'][-1]))
+        start = match.end()
+
+        if name in MARKUP_COLORS:
+            if closing:
+                stack.pop()
+            else:
+                stack.append(color)
+        else:
+            style_counts[name] += -1 if closing else 1
+            style = pygame.freetype.STYLE_NORMAL
+            for tag, flag in MARKUP_STYLES.items():
+                if style_counts[tag] > 0:
+                    style |= flag
+
+    if start < len(text):
+        runs.append((text[start:], style, colors['color'][-1], colors['bg'][-1]))
+
+    return runs
+
+
+class RichText:
+    ''' Marked-up text, laid out in *rect* with *font*.
+
+    Text added with add_text() flows on from where the last text ended,
+    wrapping at spaces when a word won't fit. The first baseline is
+    *line_spacing* (default 1.1 lines) below the top of *rect*. Text with no
+    {bg} of its own isn't given a background. Call clear() to start over.
+    '''
+    def __init__(self: 'RichText', rect: pygame.Rect, font: pygame.freetype.Font, fgcolor: pygame.Color = WHITE,
+                 line_spacing: int = None, cache: TextCache = None) -> None:
+        self.rect = pygame.Rect(rect)
+        self.font = font
+        self.fgcolor = fgcolor
+        self.line_spacing = line_spacing or int(font.get_sized_height() * 1.1)
+        self.cache = cache or text_cache
+
+        self.space_width = font.get_rect(' ').width
+        self.clear()
+
+    def clear(self: 'RichText') -> None:
+        self.fills = []  # (colour, Rect)
+        self.blits = []  # (Surface, (x, y)), ready for Surface.blits()
+        self.pen_x = self.rect.x
+        self.baseline = self.rect.y + self.line_spacing
+
+    def add_text(self: 'RichText', text: str) -> None:
+        ''' Parse, lay out and render *text*.
+        '''
+        for word in self.split_words(parse_markup(text, self.fgcolor)):
+            self.add_word(word)
+
+    def split_words(self: 'RichText', runs: list) -> list:
+        ''' Break *runs* at whitespace into words, each a list of runs.
+        '''
+        words = []
+        word = []
+        for text, style, fgcolor, bgcolor in runs:
+            for idx, piece in enumerate(WHITESPACE.split(text)):
+                if idx % 2 == 1:  # The split pattern's in a group, so spaces are every other piece.
+                    if word:
+                        words.append(word)
+                        word = []
+                elif piece:
+                    word.append((piece, style, fgcolor, bgcolor))
+        if word:
+            words.append(word)
+
+        return words
+
+    def add_word(self: 'RichText', word: list) -> None:
+        rendered = [self.cache.render(self.font, text, fgcolor, style) + (bgcolor,)
+                    for text, style, fgcolor, bgcolor in word]
+
+        width = sum(rect.width for _, rect, _ in rendered)
+        if self.pen_x > self.rect.x and self.pen_x + width > self.rect.right:
+            self.pen_x = self.rect.x
+            self.baseline += self.line_spacing
+
+        for surface, rect, bgcolor in rendered:
+            # rect.x and rect.y are the bearing and the ascent from the baseline.
+            dest = (self.pen_x + rect.x, self.baseline - rect.y)
+            if bgcolor is not None:
+                self.fills.append((bgcolor, pygame.Rect(dest, rect.size)))
+            self.blits.append((surface, dest))
+            self.pen_x += rect.width
+
+        self.pen_x += self.space_width
+
+    def draw(self: 'RichText', surface: pygame.Surface) -> None:
+        for color, rect in self.fills:
+            surface.fill(color, rect)
+        surface.blits(self.blits, doreturn=False)
@@ -0,0 +1,275 @@
+# Engine - Text helpers
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# FreeType lays out and rasterizes a string every time you render_to() it.
+# Most text on screen doesn't change from one frame to the next, so
+# TextCache keeps the rendered surfaces around and drawing is just a blit.
+
+import pygame
+import pygame.freetype
+
+from collections import OrderedDict
+
+BLACK = pygame.Color('black')
+WHITE = pygame.Color('white')
+
+TEXT_CACHE_SIZE = 512  # rendered strings
+WORD_CACHE_SIZE = 4096  # measured words per font
+
+# Text effects are (dx, dy, opacity) copies of the text in the effect
+# colour, drawn under it.
+SHADOW = ((1, 1, 255),)
+SHADOW_CORNERS = tuple((dx, dy, 255) for dy in (-1, 1) for dx in (-1, 1))
+OUTLINE = tuple((dx, dy, 255) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx != 0 or dy != 0)
+
+
+def glow(radius: int) -> tuple:
+    ''' A text effect that fades out over *radius* pixels.
+    '''
+    offsets = []
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            distance = (dx * dx + dy * dy) ** 0.5
+            if 0 < distance <= radius:
+                # Copies overlap, so each one is faint.
+                offsets.append((dx, dy, round(255 * (1 - distance / (radius + 1)) ** 2 / radius)))
+
+    return tuple(offsets)
+
+
+class TextCache:
+    ''' Rendered strings, kept in least-recently-used order.
+
+    Surfaces are keyed by font, size, style, colour and text; once there are
+    more than *max_entries*, the oldest are dropped. Other font settings
+    (antialiasing, kerning and so on) aren't part of the key, so don't change
+    them on a font you're drawing through the cache.
+    '''
+    def __init__(self: 'TextCache', max_entries: int = TEXT_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()  # key -> (Surface, Rect)
+
+        self.hits = 0
+        self.renders = 0
+
+    def render(self: 'TextCache', font: pygame.freetype.Font, text: str, color: pygame.Color,
+               style: int = pygame.freetype.STYLE_DEFAULT, size: float = 0) -> tuple:
+        ''' Like font.render(), but only rasterizes each string once.
+
+        Returns the (Surface, Rect) pair; don't draw on the Surface, it's
+        shared.
+        '''
+        key = (font, size or font.size, font.style if style == pygame.freetype.STYLE_DEFAULT else style,
+               tuple(color), text)
+        rendered = self.surfaces.get(key)
+        if rendered is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return rendered
+
+        text_surface, rect = font.render(text, color, style=style, size=size)
+        if pygame.display.get_surface() is not None:
+            text_surface = text_surface.convert_alpha()  # Several times faster to blit.
+        rendered = (text_surface, rect)
+        self.surfaces[key] = rendered
+        self.renders += 1
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+
+        return rendered
+
+    def render_to(self: 'TextCache', surface: pygame.Surface, dest: tuple, font: pygame.freetype.Font, text: str,
+                  color: pygame.Color, style: int = pygame.freetype.STYLE_DEFAULT, size: float = 0) -> pygame.Rect:
+        ''' Like font.render_to(); returns the rectangle drawn in.
+
+        If *font*.origin is set, *dest* is where the baseline starts instead
+        of the top-left corner, same as font.render_to().
+        '''
+        text_surface, rect = self.render(font, text, color, style, size)
+        if font.origin:
+            dest = (dest[0] + rect.x, dest[1] - rect.y)
+
+        return surface.blit(text_surface, dest)
+
+    def render_effect(self: 'TextCache', font: pygame.freetype.Font, text: str, color: pygame.Color, effect: tuple,
+                      effect_color: pygame.Color = BLACK, style: int = pygame.freetype.STYLE_DEFAULT,
+                      size: float = 0) -> tuple:
+        ''' Render *text* with a shadow, outline or glow *effect* baked in.
+
+        The text is rasterized twice (once in each colour) and the effect's
+        copies are composited with blits, all once; the result is cached
+        like any other string. Returns (Surface, Rect); the Rect is where the
+        Surface goes relative to where the plain text would be drawn. The
+        Surface has premultiplied alpha, so blit it with
+        BLEND_PREMULTIPLIED.
+        '''
+        key = (font, size or font.size, font.style if style == pygame.freetype.STYLE_DEFAULT else style,
+               tuple(color), text, effect, tuple(effect_color))
+        rendered = self.surfaces.get(key)
+        if rendered is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return rendered
+
+        text_surface, _ = font.render(text, color, style=style, size=size)
+        mask, _ = font.render(text, effect_color, style=style, size=size)
+        left = max([0] + [-dx for dx, _, _ in effect])
+        top = max([0] + [-dy for _, dy, _ in effect])
+        right = max([0] + [dx for dx, _, _ in effect])
+        bottom = max([0] + [dy for _, dy, _ in effect])
+
+        baked = pygame.Surface((text_surface.get_width() + left + right, text_surface.get_height() + top + bottom),
+                               pygame.SRCALPHA, 32)
+        faded = {255: mask.premul_alpha()}
+        for dx, dy, opacity in effect:
+            copy = faded.get(opacity)
+            if copy is None:
+                copy = faded[255].copy()
+                copy.fill((opacity, opacity, opacity, opacity), special_flags=pygame.BLEND_RGBA_MULT)
+                faded[opacity] = copy
+            baked.blit(copy, (left + dx, top + dy), special_flags=pygame.BLEND_PREMULTIPLIED)
+        baked.blit(text_surface.premul_alpha(), (left, top), special_flags=pygame.BLEND_PREMULTIPLIED)
+        if pygame.display.get_surface() is not None:
+            baked = baked.convert_alpha()
+
+        rendered = (baked, pygame.Rect(-left, -top, baked.get_width(), baked.get_height()))
+        self.surfaces[key] = rendered
+        self.renders += 1
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+
+        return rendered
+
+    def render_effect_to(self: 'TextCache', surface: pygame.Surface, dest: tuple, font: pygame.freetype.Font,
+                         text: str, color: pygame.Color, effect: tuple, effect_color: pygame.Color = BLACK,
+                         style: int = pygame.freetype.STYLE_DEFAULT, size: float = 0) -> pygame.Rect:
+        ''' Like render_to(), with an *effect* from render_effect().
+        '''
+        baked, rect = self.render_effect(font, text, color, effect, effect_color, style, size)
+        if font.origin:
+            text_rect = font.get_rect(text, style=style, size=size)
+            dest = (dest[0] + text_rect.x, dest[1] - text_rect.y)
+
+        return surface.blit(baked, (dest[0] + rect.x, dest[1] + rect.y), special_flags=pygame.BLEND_PREMULTIPLIED)
+
+    def clear(self: 'TextCache') -> None:
+        self.surfaces.clear()
+
+
+# Shared by everything that doesn't make its own.
+text_cache = TextCache()
+
+
+def draw_text(surface: pygame.Surface, font: pygame.freetype.Font, dest: tuple, text: str,
+              color: pygame.Color = WHITE) -> pygame.Rect:
+    ''' Draw *text* at *dest* through the shared TextCache.
+    '''
+    return text_cache.render_to(surface, dest, font, text, color)
+
+
+def effect_text(surface: pygame.Surface, font: pygame.freetype.Font, dest: tuple, text: str, effect: tuple,
+                color: pygame.Color = WHITE, effect_color: pygame.Color = BLACK) -> pygame.Rect:
+    ''' Draw *text* at *dest* with a pre-baked *effect* (SHADOW, OUTLINE,
+    glow(), ...) through the shared TextCache.
+    '''
+    return text_cache.render_effect_to(surface, dest, font, text, color, effect, effect_color)
+
+
+def shadow_text(surface: pygame.Surface, font: pygame.freetype.Font, text: str, x: int, y: int,
+                color: pygame.Color = WHITE, shadow: pygame.Color = BLACK) -> None:
+    ''' Draw text with a drop-shadow at x,y.
+    '''
+    effect_text(surface, font, (x, y), text, SHADOW_CORNERS, color, shadow)
+
+
+class WordWidths:
+    ''' Remembers how wide each word is in *font*.
+
+    Widths are thrown away if the font's size or style changes, or once
+    there are more than WORD_CACHE_SIZE of them.
+    '''
+    def __init__(self: 'WordWidths', font: pygame.freetype.Font) -> None:
+        self.font = font
+        self.widths = {}
+        self.reset()
+
+    def reset(self: 'WordWidths') -> None:
+        self.widths.clear()
+        self.font_key = (self.font.size, self.font.style)
+        self.space_width = self.font.get_rect(' ').width
+
+    def measure(self: 'WordWidths', word: str) -> int:
+        width = self.widths.get(word)
+        if width is None:
+            if len(self.widths) >= WORD_CACHE_SIZE:
+                self.widths.clear()
+            width = self.font.get_rect(word).width
+            self.widths[word] = width
+
+        return width
+
+    def check(self: 'WordWidths') -> 'WordWidths':
+        if (self.font.size, self.font.style) != self.font_key:
+            self.reset()
+
+        return self
+
+
+word_widths = {}  # font -> WordWidths
+
+
+def get_word_widths(font: pygame.freetype.Font) -> WordWidths:
+    widths = word_widths.get(font)
+    if widths is None:
+        widths = WordWidths(font)
+        word_widths[font] = widths
+
+    return widths.check()
+
+
+def wrap_text(font: pygame.freetype.Font, text: str, max_width: int) -> list:
+    ''' Split *text* into lines that fit in *max_width* pixels.
+
+    Lines are only broken at spaces; a single word that's too long gets a
+    line to itself. Each word is measured once (and remembered for next
+    time), and a line's width is the sum of its words and spaces, so this
+    is linear in the length of the text.
+    '''
+    words = text.split()
+    if len(words) < 2:
+        return [text]
+
+    widths = get_word_widths(font)
+    measure = widths.measure
+    space_width = widths.space_width
+
+    lines = []
+    line = [words[0]]
+    line_width = measure(words[0])
+    for word in words[1:]:
+        word_width = measure(word)
+        if line_width + space_width + word_width < max_width:
+            line.append(word)
+            line_width += space_width + word_width
+        else:
+            lines.append(' '.join(line))
+            line = [word]
+            line_width = word_width
+    lines.append(' '.join(line))
+
+    if len(lines) == 1:
+        return [text]  # It all fits; leave it alone.
+
+    return lines
+
+
+def wrap_document(font: pygame.freetype.Font, text: str, max_width: int) -> list:
+    ''' Wrap every paragraph (line) of *text*; blank lines are kept.
+    '''
+    lines = []
+    for paragraph in text.splitlines():
+        lines.extend(wrap_text(font, paragraph, max_width) if paragraph.strip() else [''])
+
+    return lines
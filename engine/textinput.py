@@ -0,0 +1,456 @@
+# Engine - Editable text fields
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Text comes from TEXTINPUT events, so shift, keyboard layouts and input
+# methods (IMEs) all work; KEYDOWN is only used for editing and movement
+# keys. The text lives in a gap buffer, so typing at the cursor doesn't copy
+# everything after it. Each line's rendered once and only re-rendered when
+# it's edited, and draw() only redraws the rows that changed and returns
+# their rectangles for pygame.display.update().
+
+import pygame
+import pygame.freetype
+
+BLACK = pygame.Color('black')
+WHITE = pygame.Color('white')
+SELECTION = pygame.Color(64, 96, 160)
+
+GAP_SIZE = 64  # characters
+CARET_BLINK = 0.5  # seconds
+CARET_WIDTH = 2  # pixels
+
+
+class GapBuffer:
+    ''' A string that's cheap to edit at the cursor.
+
+    The characters live in a list with a gap at the cursor; inserting fills
+    the gap and deleting widens it, and moving the cursor moves the gap,
+    copying only the characters between the old and new positions.
+    '''
+    def __init__(self: 'GapBuffer', text: str = '', gap: int = GAP_SIZE) -> None:
+        self.chars = list(text) + [None] * gap
+        self.gap_start = len(text)
+        self.gap_end = len(self.chars)
+
+    def __len__(self: 'GapBuffer') -> int:
+        return len(self.chars) - (self.gap_end - self.gap_start)
+
+    def __str__(self: 'GapBuffer') -> str:
+        return ''.join(self.chars[:self.gap_start]) + ''.join(self.chars[self.gap_end:])
+
+    def __getitem__(self: 'GapBuffer', index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('GapBuffer index out of range')
+
+        return self.chars[index if index < self.gap_start else index + self.gap_end - self.gap_start]
+
+    def slice(self: 'GapBuffer', start: int, end: int) -> str:
+        ''' The text from *start* up to *end*.
+        '''
+        gap = self.gap_end - self.gap_start
+        if end <= self.gap_start:
+            return ''.join(self.chars[start:end])
+        elif start >= self.gap_start:
+            return ''.join(self.chars[start + gap:end + gap])
+
+        return ''.join(self.chars[start:self.gap_start]) + ''.join(self.chars[self.gap_end:end + gap])
+
+    def move(self: 'GapBuffer', pos: int) -> None:
+        ''' Move the gap (the cursor) to *pos*.
+        '''
+        pos = max(0, min(pos, len(self)))
+        if pos < self.gap_start:
+            count = self.gap_start - pos
+            self.chars[self.gap_end - count:self.gap_end] = self.chars[pos:self.gap_start]
+            self.gap_start = pos
+            self.gap_end -= count
+        elif pos > self.gap_start:
+            count = pos - self.gap_start
+            self.chars[self.gap_start:pos] = self.chars[self.gap_end:self.gap_end + count]
+            self.gap_start = pos
+            self.gap_end += count
+
+    def insert(self: 'GapBuffer', text: str) -> None:
+        ''' Insert *text* at the cursor, leaving the cursor after it.
+        '''
+        if len(text) > self.gap_end - self.gap_start:
+            grow = max(len(text), len(self.chars))  # Doubling keeps inserts cheap on average.
+            self.chars[self.gap_end:self.gap_end] = [None] * grow
+            self.gap_end += grow
+
+        self.chars[self.gap_start:self.gap_start + len(text)] = text
+        self.gap_start += len(text)
+
+    def delete_before(self: 'GapBuffer', count: int) -> None:
+        self.gap_start -= min(count, self.gap_start)
+
+    def delete_after(self: 'GapBuffer', count: int) -> None:
+        self.gap_end += min(count, len(self.chars) - self.gap_end)
+
+    def find(self: 'GapBuffer', char: str, start: int) -> int:
+        ''' Index of the first *char* at or after *start*, or -1.
+        '''
+        gap = self.gap_end - self.gap_start
+        if start < self.gap_start:
+            try:
+                return self.chars.index(char, start, self.gap_start)
+            except ValueError:
+                start = self.gap_start
+        try:
+            return self.chars.index(char, start + gap) - gap
+        except ValueError:
+            return -1
+
+    def rfind(self: 'GapBuffer', char: str, end: int) -> int:
+        ''' Index of the last *char* before *end*, or -1.
+        '''
+        chars = self.chars
+        gap = self.gap_end - self.gap_start
+        for index in range(end + gap - 1, self.gap_end - 1, -1):  # After the gap.
+            if chars[index] == char:
+                return index - gap
+        for index in range(min(end, self.gap_start) - 1, -1, -1):
+            if chars[index] == char:
+                return index
+
+        return -1
+
+
+class TextInput:
+    ''' A multi-line text field in *rect*.
+
+    Pass it events with handle_event(), call update() once per frame for
+    the blinking caret, and draw() to redraw whatever's changed. Lines don't
+    wrap; the view scrolls to keep the caret visible. Shift with the
+    movement keys selects, and Ctrl-A selects everything.
+    '''
+    def __init__(self: 'TextInput', rect: pygame.Rect, font: pygame.freetype.Font, color: pygame.Color = WHITE,
+                 background: pygame.Color = BLACK, selection: pygame.Color = SELECTION, text: str = '') -> None:
+        self.rect = pygame.Rect(rect)
+        self.font = font
+        self.color = color
+        self.background = background
+        self.selection = selection
+
+        self.line_height = font.get_sized_height()
+        self.ascender = font.get_sized_ascender()
+        self.rows = max(1, self.rect.height // self.line_height)
+
+        self.buffer = GapBuffer(text)
+        self.advances = {}  # char -> pixels
+        self.lines = [None] * (text.count('\n') + 1)  # (Surface, Rect, width) per line, or None if it's not rendered.
+        self.row = len(self.lines) - 1  # The cursor's line.
+        self.anchor = None  # Other end of the selection, if there is one.
+        self.goal_x = None  # Where Up and Down try to put the caret.
+        self.composition = None  # IME text that's still being composed.
+
+        self.top = 0  # First row in view.
+        self.scroll_x = 0
+        self.caret_x = 0
+        self.selected = None  # ((row, x), (row, x)) of the selection.
+        self.blink = 0.0
+        self.caret_on = True
+
+        self.all_dirty = True
+        self.dirty_rows = set()
+        self.update_caret()
+
+    def get_text(self: 'TextInput') -> str:
+        return str(self.buffer)
+
+    def set_text(self: 'TextInput', text: str) -> None:
+        self.buffer = GapBuffer(text)
+        self.lines = [None] * (text.count('\n') + 1)
+        self.row = len(self.lines) - 1
+        self.anchor = None
+        self.all_dirty = True
+        self.update_caret()
+
+    @property
+    def cursor(self: 'TextInput') -> int:
+        return self.buffer.gap_start
+
+    def line_start(self: 'TextInput', pos: int) -> int:
+        return self.buffer.rfind('\n', pos) + 1
+
+    def line_end(self: 'TextInput', pos: int) -> int:
+        end = self.buffer.find('\n', pos)
+        return len(self.buffer) if end == -1 else end
+
+    def row_start(self: 'TextInput', row: int) -> int:
+        ''' Where *row* starts; it's found from the cursor, so keep it close.
+        '''
+        pos = self.line_start(self.cursor)
+        for _ in range(self.row - row):
+            pos = self.line_start(pos - 1)
+        for _ in range(row - self.row):
+            pos = self.line_end(pos) + 1
+
+        return pos
+
+    def advance(self: 'TextInput', char: str) -> float:
+        advance = self.advances.get(char)
+        if advance is None:
+            metrics = self.font.get_metrics(char)[0]
+            advance = metrics[4] if metrics is not None else 0
+            self.advances[char] = advance
+
+        return advance
+
+    def text_width(self: 'TextInput', text: str) -> int:
+        return round(sum(self.advance(char) for char in text))
+
+    def render_line(self: 'TextInput', row: int) -> tuple:
+        ''' Render *row* if it isn't already; returns (Surface, Rect, width).
+        '''
+        line = self.lines[row]
+        if line is None:
+            start = self.row_start(row)
+            text = self.buffer.slice(start, self.line_end(start))
+            if text:
+                surface, rect = self.font.render(text, self.color)
+                if pygame.display.get_surface() is not None:
+                    surface = surface.convert_alpha()
+                line = (surface, rect, self.text_width(text))
+            else:
+                line = (None, None, 0)
+            self.lines[row] = line
+
+        return line
+
+    def mark_rows(self: 'TextInput', first: int, last: int) -> None:
+        self.dirty_rows.update(range(min(first, last), max(first, last) + 1))
+
+    def edit(self: 'TextInput', start: int, end: int, text: str) -> None:
+        ''' Replace the text from *start* to *end* (which the cursor is
+        between) with *text*, and re-render just the lines involved.
+        '''
+        first_row = self.row - self.buffer.slice(start, self.cursor).count('\n')
+        old_rows = self.buffer.slice(start, end).count('\n') + 1
+
+        self.buffer.move(end)
+        self.buffer.delete_before(end - start)
+        self.buffer.insert(text)
+        self.anchor = None
+        self.goal_x = None
+
+        new_lines = self.buffer.slice(self.line_start(start), self.line_end(self.cursor)).split('\n')
+        self.lines[first_row:first_row + old_rows] = [None] * len(new_lines)  # Rendered when they're drawn.
+        self.row = first_row + len(new_lines) - 1
+
+        if len(new_lines) == old_rows:
+            self.mark_rows(first_row, self.row)
+        else:
+            self.mark_rows(first_row, max(self.row, self.top + self.rows))  # Everything below moved.
+        self.update_caret()
+
+    def insert(self: 'TextInput', text: str) -> None:
+        ''' Type *text* at the cursor, replacing the selection.
+        '''
+        start, end = self.get_selection() or (self.cursor, self.cursor)
+        self.edit(start, end, text)
+
+    def delete(self: 'TextInput', direction: int) -> None:
+        ''' Backspace (*direction* -1) or Delete (1).
+        '''
+        selection = self.get_selection()
+        if selection is not None:
+            self.edit(selection[0], selection[1], '')
+        elif direction < 0 and self.cursor > 0:
+            self.edit(self.cursor - 1, self.cursor, '')
+        elif direction > 0 and self.cursor < len(self.buffer):
+            self.edit(self.cursor, self.cursor + 1, '')
+
+    def get_selection(self: 'TextInput') -> tuple:
+        ''' (start, end) of the selection, or None.
+        '''
+        if self.anchor is None or self.anchor == self.cursor:
+            return None
+
+        return (min(self.anchor, self.cursor), max(self.anchor, self.cursor))
+
+    def move_to(self: 'TextInput', pos: int, select: bool = False) -> None:
+        pos = max(0, min(pos, len(self.buffer)))
+        old_row = self.row
+        if self.selected is not None:
+            self.mark_rows(self.selected[0][0], self.selected[1][0])  # The old selection needs to be redrawn.
+        self.goal_x = None
+        if select and self.anchor is None:
+            self.anchor = self.cursor
+        elif not select:
+            self.anchor = None
+
+        if pos > self.cursor:
+            self.row += self.buffer.slice(self.cursor, pos).count('\n')
+        else:
+            self.row -= self.buffer.slice(pos, self.cursor).count('\n')
+        self.buffer.move(pos)
+
+        self.mark_rows(old_row, self.row)
+        self.update_caret()
+
+    def move_line(self: 'TextInput', rows: int, select: bool = False) -> None:
+        ''' Move the caret up (-1) or down (1) a line, keeping its x position.
+        '''
+        goal_x = self.caret_x if self.goal_x is None else self.goal_x
+        start = self.line_start(self.cursor)
+        if rows < 0:
+            if start == 0:
+                return
+            start = self.line_start(start - 1)
+        else:
+            end = self.line_end(self.cursor)
+            if end == len(self.buffer):
+                return
+            start = end + 1
+
+        line = self.buffer.slice(start, self.line_end(start))
+        column = 0
+        x = 0
+        for char in line:
+            advance = self.advance(char)
+            if x + advance / 2 > goal_x:
+                break
+            x += advance
+            column += 1
+
+        self.move_to(start + column, select)
+        self.goal_x = goal_x
+
+    def update_caret(self: 'TextInput') -> None:
+        ''' Work out where the caret and selection are, and scroll to keep
+        the caret in view.
+        '''
+        start = self.line_start(self.cursor)
+        self.caret_x = self.text_width(self.buffer.slice(start, self.cursor))
+
+        selection = self.get_selection()
+        if selection is None:
+            self.selected = None
+        else:
+            anchor_start = self.line_start(self.anchor)
+            anchor_row = self.row + (self.buffer.slice(self.cursor, self.anchor).count('\n') if self.anchor > self.cursor
+                                     else -self.buffer.slice(self.anchor, self.cursor).count('\n'))
+            anchor = (anchor_row, self.text_width(self.buffer.slice(anchor_start, self.anchor)))
+            caret = (self.row, self.caret_x)
+            self.selected = (anchor, caret) if anchor < caret else (caret, anchor)
+            self.mark_rows(anchor_row, self.row)
+
+        top = min(max(self.top, self.row - self.rows + 1), self.row)
+        scroll_x = min(max(self.scroll_x, self.caret_x + CARET_WIDTH - self.rect.width), self.caret_x)
+        if top != self.top or scroll_x != self.scroll_x:
+            self.top = top
+            self.scroll_x = scroll_x
+            self.all_dirty = True
+
+        self.blink = 0.0
+        self.caret_on = True
+        self.dirty_rows.add(self.row)
+
+        if pygame.display.get_surface() is not None:
+            pygame.key.set_text_input_rect(self.get_caret_rect())  # Where the IME shows its candidates.
+
+    def get_caret_rect(self: 'TextInput') -> pygame.Rect:
+        return pygame.Rect(self.rect.x + self.caret_x - self.scroll_x, self.rect.y + (self.row - self.top) * self.line_height,
+                           CARET_WIDTH, self.line_height)
+
+    def handle_event(self: 'TextInput', event: pygame.event.Event) -> bool:
+        ''' Deal with a TEXTINPUT, TEXTEDITING or KEYDOWN event; returns True
+        if the event was used.
+        '''
+        if event.type == pygame.TEXTINPUT:
+            self.composition = None
+            self.insert(event.text)
+        elif event.type == pygame.TEXTEDITING:
+            self.composition = self.font.render(event.text, self.color) if event.text else None
+            self.dirty_rows.add(self.row)
+        elif event.type == pygame.KEYDOWN:
+            shift = bool(event.mod & pygame.KMOD_SHIFT)
+            if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                self.insert('\n')
+            elif event.key == pygame.K_BACKSPACE:
+                self.delete(-1)
+            elif event.key == pygame.K_DELETE:
+                self.delete(1)
+            elif event.key == pygame.K_LEFT:
+                selection = self.get_selection()
+                self.move_to(selection[0] if selection and not shift else self.cursor - 1, shift)
+            elif event.key == pygame.K_RIGHT:
+                selection = self.get_selection()
+                self.move_to(selection[1] if selection and not shift else self.cursor + 1, shift)
+            elif event.key == pygame.K_UP:
+                self.move_line(-1, shift)
+            elif event.key == pygame.K_DOWN:
+                self.move_line(1, shift)
+            elif event.key == pygame.K_HOME:
+                self.move_to(self.line_start(self.cursor), shift)
+            elif event.key == pygame.K_END:
+                self.move_to(self.line_end(self.cursor), shift)
+            elif event.key == pygame.K_a and event.mod & pygame.KMOD_CTRL:
+                self.move_to(0)
+                self.move_to(len(self.buffer), True)
+            else:
+                return False
+        else:
+            return False
+
+        return True
+
+    def update(self: 'TextInput', dt: float) -> None:
+        self.blink += dt
+        if self.blink >= CARET_BLINK:
+            self.blink -= CARET_BLINK
+            self.caret_on = not self.caret_on
+            self.dirty_rows.add(self.row)
+
+    def draw(self: 'TextInput', surface: pygame.Surface) -> list:
+        ''' Redraw the rows that have changed; returns their Rects.
+        '''
+        if self.all_dirty:
+            rows = range(self.top, self.top + self.rows)
+        else:
+            rows = sorted(row for row in self.dirty_rows if self.top <= row < self.top + self.rows)
+        self.all_dirty = False
+        self.dirty_rows.clear()
+
+        clip = surface.get_clip()
+        surface.set_clip(self.rect)
+        rects = [self.draw_row(surface, row) for row in rows]
+        surface.set_clip(clip)
+
+        return rects
+
+    def draw_row(self: 'TextInput', surface: pygame.Surface, row: int) -> pygame.Rect:
+        row_rect = pygame.Rect(self.rect.x, self.rect.y + (row - self.top) * self.line_height, self.rect.width,
+                               self.line_height).clip(self.rect)
+        surface.fill(self.background, row_rect)
+        if row >= len(self.lines):
+            return row_rect
+
+        x = self.rect.x - self.scroll_x
+        line_surface, rect, width = self.render_line(row)
+        if self.selected is not None and self.selected[0][0] <= row <= self.selected[1][0]:
+            (start_row, start_x), (end_row, end_x) = self.selected
+            left = start_x if row == start_row else 0
+            right = end_x if row == end_row else width + CARET_WIDTH  # Show the newline.
+            surface.fill(self.selection, pygame.Rect(x + left, row_rect.y, right - left, self.line_height))
+
+        baseline = row_rect.y + self.ascender
+        if line_surface is not None:
+            surface.blit(line_surface, (x + rect.x, baseline - rect.y))
+
+        if row == self.row:
+            caret = self.get_caret_rect()
+            if self.composition is not None:
+                # Underlined, to show it's not really typed yet.
+                composition, rect = self.composition
+                surface.blit(composition, (caret.x + rect.x, baseline - rect.y))
+                surface.fill(self.color, pygame.Rect(caret.x, caret.bottom - 1, rect.x + rect.width, 1))
+            elif self.caret_on:
+                surface.fill(self.color, caret)
+
+        return row_rect
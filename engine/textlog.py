@@ -0,0 +1,81 @@
+# Engine - Scrollback text log
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Dropping the oldest line with `lines = lines[1:]` copies the whole list
+# every time. A ring buffer just overwrites the oldest slot, so adding a line
+# costs the same no matter how much history there is.
+
+SCROLLBACK = 1000  # lines
+
+
+class TextLog:
+    ''' Fixed-capacity ring buffer of text lines, with a scrollable view.
+
+    Holds up to *capacity* lines; adding more drops the oldest. Indexing
+    goes from the oldest line (0) to the newest (-1). The view shows
+    *visible* lines, *scroll* lines back from the newest.
+    '''
+    def __init__(self: 'TextLog', visible: int, capacity: int = SCROLLBACK) -> None:
+        if capacity < 1:
+            raise ValueError('Capacity must be at least 1: {0}'.format(capacity))
+
+        self.capacity = capacity
+        self.visible = visible
+        self.lines = [None] * capacity
+        self.start = 0  # Index of the oldest line in self.lines.
+        self.count = 0
+        self.scroll = 0  # Lines scrolled back from the newest.
+
+    def __len__(self: 'TextLog') -> int:
+        return self.count
+
+    def __getitem__(self: 'TextLog', index: int) -> str:
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError('TextLog index out of range')
+
+        return self.lines[(self.start + index) % self.capacity]
+
+    def __iter__(self: 'TextLog'):
+        for i in range(self.count):
+            yield self.lines[(self.start + i) % self.capacity]
+
+    def append(self: 'TextLog', line: str) -> None:
+        ''' Add a line, dropping the oldest one if we're full.
+
+        If the view's scrolled back, it stays on the same lines.
+        '''
+        if self.count < self.capacity:
+            self.lines[(self.start + self.count) % self.capacity] = line
+            self.count += 1
+        else:
+            self.lines[self.start] = line
+            self.start = (self.start + 1) % self.capacity
+
+        if self.scroll > 0:
+            self.scroll_by(1)
+
+    def extend(self: 'TextLog', lines: list) -> None:
+        for line in lines:
+            self.append(line)
+
+    def clear(self: 'TextLog') -> None:
+        self.lines = [None] * self.capacity
+        self.start = 0
+        self.count = 0
+        self.scroll = 0
+
+    def scroll_by(self: 'TextLog', lines: int) -> None:
+        ''' Scroll back (positive) or forward (negative) through the history.
+        '''
+        self.scroll = max(0, min(self.scroll + lines, self.count - self.visible))
+
+    def visible_lines(self: 'TextLog'):
+        ''' The lines in view, oldest (top) first.
+        '''
+        end = self.count - self.scroll
+        for i in range(max(0, end - self.visible), end):
+            yield self.lines[(self.start + i) % self.capacity]
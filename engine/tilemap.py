@@ -0,0 +1,403 @@
+# Engine - Tiled map loader and renderer
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import base64
+import bisect
+import gzip
+import os
+import pygame
+import struct
+import zlib
+
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+from . import trace
+from .assets import load_image
+from .atlas import pack_tiles
+
+# Tiled stores flips in the high bits of each GID; see
+# https://doc.mapeditor.org/en/stable/reference/global-tile-ids/
+FLIPPED_HORIZONTALLY = 0x80000000
+FLIPPED_VERTICALLY = 0x40000000
+FLIPPED_DIAGONALLY = 0x20000000
+ROTATED_HEXAGONAL_120 = 0x10000000  # Hexagonal maps only; ignored.
+FLIP_FLAGS = FLIPPED_HORIZONTALLY | FLIPPED_VERTICALLY | FLIPPED_DIAGONALLY
+GID_MASK = 0x0fffffff
+
+FLIPPED_TILE_CACHE_SIZE = 256  # Flipped/rotated tile variants to keep.
+
+
+def transform_tile(tile: pygame.Surface, flags: int) -> pygame.Surface:
+    ''' Apply Tiled's flip *flags* to *tile*.
+
+    The diagonal flip (swapping x and y) happens first, then the horizontal
+    and vertical flips.
+    '''
+    if flags & FLIPPED_DIAGONALLY:
+        tile = pygame.transform.flip(pygame.transform.rotate(tile, -90), True, False)
+
+    return pygame.transform.flip(tile, bool(flags & FLIPPED_HORIZONTALLY), bool(flags & FLIPPED_VERTICALLY))
+
+
+def decode_layer(data: ElementTree.Element) -> list:
+    ''' Decode a Tiled <data> element into one big row of tile IDs.
+
+    For help decoding other formats, check out my tileset crusher's code:
+    https://github.com/Taffer/crushtileset/
+    '''
+    encoding = data.attrib.get('encoding')
+    compression = data.attrib.get('compression', 'none')
+
+    if encoding == 'csv':
+        # CSV data is organized into rows, so we make this one big row.
+        return [int(c) for c in data.text.replace('\n', ',').split(',') if c.strip() != '']
+    elif encoding == 'base64':
+        the_data = base64.b64decode(data.text.strip())
+        if compression == 'zlib':
+            the_data = zlib.decompress(the_data)
+        elif compression == 'gzip':
+            the_data = gzip.decompress(the_data)
+        elif compression != 'none':
+            raise RuntimeError('Unsupported encoding/compression.')
+
+        return [x[0] for x in struct.iter_unpack('<I', the_data)]
+
+    raise RuntimeError('Unsupported encoding/compression.')
+
+
+def parse_map(map_path: str, decode_images: bool = False) -> dict:
+    ''' Read a Tiled map and its tilesets without touching the display.
+
+    This is the slow part of loading a map (XML parsing, decompression and,
+    with *decode_images*, PNG decoding), so it's safe to run on a worker
+    thread; see engine.loader.
+    '''
+    tree = ElementTree.parse(map_path)
+    root = tree.getroot()
+
+    # Tileset and image atlas paths are relative to the map file.
+    prefix = os.path.split(map_path)[0]
+
+    tilesets = []
+    next_gid = 1
+    for tileset in root.findall('tileset'):
+        tileset_path = os.path.join(prefix, tileset.attrib['source'])
+        tileset_prefix = os.path.split(tileset_path)[0]
+        tileset_tree = ElementTree.parse(tileset_path)
+        tileset_root = tileset_tree.getroot()
+
+        image = tileset_root.find('image')
+        image_path = os.path.join(tileset_prefix, image.attrib['source'])
+
+        # Animated tiles: local tile ID -> [(local frame tile ID, seconds)]
+        animations = {}
+        for tile in tileset_root.findall('tile'):
+            animation = tile.find('animation')
+            if animation is not None:
+                animations[int(tile.attrib['id'])] = [(int(frame.attrib['tileid']), int(frame.attrib['duration']) / 1000)
+                                                      for frame in animation.findall('frame')]
+
+        tilesets.append({
+            'first_gid': int(tileset.attrib.get('firstgid', next_gid)),
+            'image_path': image_path,
+            'image': pygame.image.load(image_path) if decode_images else None,
+            'animations': animations,
+        })
+        next_gid = tilesets[-1]['first_gid'] + int(tileset_root.attrib.get('tilecount', 0))
+
+    layers = []
+    layer_properties = {}  # Layer name -> {property name: value string}
+    for layer in root.findall('layer'):
+        layers.append((layer.attrib['name'], decode_layer(layer.find('data'))))
+        layer_properties[layer.attrib['name']] = {prop.attrib['name']: prop.attrib.get('value', prop.text)
+                                                  for prop in layer.findall('properties/property')}
+
+    return {
+        'root': root,
+        'map_width': int(root.attrib['width']),  # Map size in tiles.
+        'map_height': int(root.attrib['height']),
+        'tile_width': int(root.attrib['tilewidth']),  # Tile size in pixels.
+        'tile_height': int(root.attrib['tileheight']),
+        'tilesets': tilesets,
+        'layers': layers,
+        'layer_properties': layer_properties,
+    }
+
+
+class TilesetClock:
+    ''' One animation clock for all of a tileset's animated tiles.
+
+    *animations* maps a tile ID to its [(frame tile ID, seconds)] list.
+    '''
+    def __init__(self: 'TilesetClock', animations: dict) -> None:
+        self.time = 0
+        self.animations = {}  # tile ID -> (frame IDs, frame end times, total time)
+        self.current = {}  # tile ID -> frame ID being shown
+        for tile_id, frames in animations.items():
+            ends = []
+            total = 0
+            for _, duration in frames:
+                total += duration
+                ends.append(total)
+            self.animations[tile_id] = ([frame_id for frame_id, _ in frames], ends, total)
+            self.current[tile_id] = frames[0][0]
+
+    def advance(self: 'TilesetClock', dt: float) -> list:
+        ''' Move the clock forward *dt* seconds.
+
+        Returns a list of (tile ID, frame ID) for tiles showing a new frame.
+        '''
+        self.time += dt
+
+        changed = []
+        for tile_id, (frame_ids, ends, total) in self.animations.items():
+            if total <= 0:
+                continue
+
+            frame_id = frame_ids[bisect.bisect_right(ends, self.time % total)]
+            if frame_id != self.current[tile_id]:
+                self.current[tile_id] = frame_id
+                changed.append((tile_id, frame_id))
+
+        return changed
+
+
+# Tiled map parser.
+class Map:
+    def __init__(self: 'Map', map_path: str, parsed: dict = None, pack: bool = False, keep: tuple = ()) -> None:
+        ''' Load a map; *parsed* is parse_map()'s output if you've already
+        got it.
+
+        With *pack*, only the tiles the map uses (plus any GIDs in *keep*) are
+        copied into a single atlas, and the layers are renumbered to match;
+        use tile_id() to look up a tile by its Tiled GID.
+        '''
+        if parsed is None:
+            parsed = parse_map(map_path)
+
+        self.root = parsed['root']
+
+        # Map size in tiles.
+        self.map_width = parsed['map_width']
+        self.map_height = parsed['map_height']
+
+        # Tile size in pixels.
+        self.tile_width = parsed['tile_width']
+        self.tile_height = parsed['tile_height']
+
+        self.layer_names = []  # In drawing order.
+        self.layer_data = {}
+        for name, data in parsed['layers']:
+            self.layer_names.append(name)
+            self.layer_data[name] = data
+        self.layer_properties = parsed['layer_properties']
+
+        self.atlas = None
+        self.gid_map = None  # Tiled GID -> index in self.tiles, if packed.
+
+        # Flipped and rotated tiles are made when they're first drawn.
+        self.flipped_tiles = OrderedDict()
+        if pack:
+            self.pack_tilesets(parsed['tilesets'], keep)
+        else:
+            self.load_tilesets(parsed['tilesets'])
+
+        self.setup_animations(parsed['tilesets'])
+
+    def load_tilesets(self: 'Map', tilesets: list) -> None:
+        self.tiles = [None]  # Index 0 means "don't draw a tile" in Tiled.
+        for tileset in tilesets:
+            # Tile IDs in the layers are offset by the tileset's firstgid.
+            while len(self.tiles) < tileset['first_gid']:
+                self.tiles.append(None)
+
+            texture = load_image(tileset['image_path'])  # Shared if another map uses it.
+            texture_rect = texture.get_rect()
+
+            # Create subsurfaces for the tiles in the atlas.
+            for y in range(texture_rect.height // self.tile_height):
+                for x in range(texture_rect.width // self.tile_width):
+                    tile_rect = pygame.Rect(x * self.tile_width, y * self.tile_height, self.tile_width, self.tile_height)
+                    self.tiles.append(texture.subsurface(tile_rect))
+
+    def pack_tilesets(self: 'Map', tilesets: list, keep: tuple) -> None:
+        used = set(keep)
+        for data in self.layer_data.values():
+            used.update(gid & GID_MASK for gid in data)
+        used.discard(0)
+
+        # Keep every frame of the animated tiles we're keeping.
+        for tileset in tilesets:
+            first_gid = tileset['first_gid']
+            for local_id, frames in tileset['animations'].items():
+                if first_gid + local_id in used:
+                    used.update(first_gid + frame_id for frame_id, _ in frames)
+
+        # Load the tilesets' images through the asset cache, so maps sharing a
+        # tileset only decode it once, packed or not.
+        images = []
+        for tileset in sorted(tilesets, key=lambda t: t['first_gid']):
+            image = tileset['image']
+            if image is None:
+                image = load_image(tileset['image_path'])
+            images.append((tileset['first_gid'], image, image.get_width() // self.tile_width,
+                           image.get_height() // self.tile_height))
+
+        sources = []
+        self.gid_map = {0: 0}
+        for gid in sorted(used):
+            # The tile is in the last tileset starting at or before its GID.
+            for first_gid, image, columns, rows in reversed(images):
+                if first_gid <= gid:
+                    break
+            else:
+                continue
+
+            local_id = gid - first_gid
+            if local_id >= columns * rows:
+                continue  # Not in any tileset; draw nothing.
+
+            area = pygame.Rect((local_id % columns) * self.tile_width, (local_id // columns) * self.tile_height,
+                               self.tile_width, self.tile_height)
+            sources.append((image, area))
+            self.gid_map[gid] = len(sources)
+
+        self.atlas, tiles = pack_tiles(sources, self.tile_width, self.tile_height)
+        self.tiles = [None] + tiles
+
+        for name in self.layer_names:
+            self.layer_data[name] = [self.tile_id(gid) for gid in self.layer_data[name]]
+
+    def tile_id(self: 'Map', gid: int) -> int:
+        ''' Index in self.tiles for the Tiled *gid*; flip flags are kept.
+        '''
+        if self.gid_map is None:
+            return gid
+
+        tile_id = self.gid_map.get(gid & GID_MASK, 0)
+        return tile_id | (gid & FLIP_FLAGS) if tile_id != 0 else 0
+
+    def setup_animations(self: 'Map', tilesets: list) -> None:
+        # tile_frames is the lookup table the renderer uses: the texture to
+        # draw for each tile ID. Without animations, that's just the tiles.
+        self.tile_frames = self.tiles
+        self.frame_ids = None  # Tile ID -> frame tile ID being shown.
+        self.clocks = []
+        self.animated_cells = {}  # Layer -> indexes of cells with animated tiles.
+
+        for tileset in tilesets:
+            animations = {}
+            first_gid = tileset['first_gid']
+            for local_id, frames in tileset['animations'].items():
+                tile_id = self.tile_id(first_gid + local_id)
+                if tile_id != 0 and frames:
+                    animations[tile_id] = [(self.tile_id(first_gid + frame_id), duration) for frame_id, duration in frames]
+            if animations:
+                self.clocks.append(TilesetClock(animations))
+
+        if not self.clocks:
+            return
+
+        self.tile_frames = list(self.tiles)
+        self.frame_ids = list(range(len(self.tiles)))
+        animated = set()
+        for clock in self.clocks:
+            animated.update(clock.animations)
+            for tile_id, frame_id in clock.current.items():
+                self.show_frame(tile_id, frame_id)
+
+        for name in self.layer_names:
+            self.animated_cells[name] = [i for i, gid in enumerate(self.layer_data[name]) if gid & GID_MASK in animated]
+
+    def show_frame(self: 'Map', tile_id: int, frame_id: int) -> None:
+        self.frame_ids[tile_id] = frame_id
+        self.tile_frames[tile_id] = self.tiles[frame_id]
+
+    def update(self: 'Map', dt: float) -> list:
+        ''' Advance the tile animations by *dt* seconds.
+
+        Returns the IDs of tiles that are showing a new frame; anything that
+        caches drawn tiles only needs to redraw the animated_cells using them.
+        '''
+        if not self.clocks:
+            return []
+
+        changed = []
+        for clock in self.clocks:
+            for tile_id, frame_id in clock.advance(dt):
+                self.show_frame(tile_id, frame_id)
+                changed.append(tile_id)
+
+        return changed
+
+    @trace.traced
+    def render(self: 'Map', layer: str, surface: pygame.Surface, viewport: pygame.Rect, offset_x: int = 0,
+               offset_y: int = 0) -> None:
+        ''' Draw *layer* on *surface*.
+
+        The *viewport* is in *tile* co-ordinates, the offsets are in pixels.
+        '''
+        # This use case seems to be faster than using blits(); the overhead of
+        # creating a list of tuples is probably what kills it. To check, run
+        # `python3 -m benchmarks.blits` from the top of the repo.
+        max_x = min(viewport.width, self.map_width - viewport.x)
+        max_y = min(viewport.height, self.map_height - viewport.y)
+        data = self.layer_data[layer]
+        tiles = self.tile_frames
+        tile_count = len(tiles)  # Anything bigger has flip flags.
+        for y in range(max_y):
+            start = self.get_index(viewport.x, y + viewport.y)
+            target_y = offset_y + y * self.tile_height
+            for x, tile_id in enumerate(data[start:start + max_x]):
+                tile = tiles[tile_id] if tile_id < tile_count else self.get_flipped_tile(tile_id)
+                if tile is not None:
+                    surface.blit(tile, (offset_x + x * self.tile_width, target_y))
+
+    def get_index(self: 'Map', x: int, y: int) -> int:
+        return x + y * self.map_width
+
+    def get_tile(self: 'Map', layer: str, x: int, y: int) -> int:
+        return self.layer_data[layer][self.get_index(x, y)]
+
+    def get_tile_texture(self: 'Map', idx: int) -> pygame.Surface:
+        if idx & FLIP_FLAGS:
+            return self.get_flipped_tile(idx)
+
+        return self.tile_frames[idx] if idx < len(self.tile_frames) else None
+
+    def get_frame_id(self: 'Map', idx: int) -> int:
+        ''' The tile ID (with any flip flags) actually being shown for *idx*.
+        '''
+        if self.frame_ids is None or idx & GID_MASK >= len(self.frame_ids):
+            return idx
+
+        return self.frame_ids[idx & GID_MASK] | (idx & FLIP_FLAGS)
+
+    def get_flipped_tile(self: 'Map', idx: int) -> pygame.Surface:
+        ''' Get the tile for a GID with flip flags set.
+
+        Variants are made on demand and the least recently used ones are
+        dropped once there are more than FLIPPED_TILE_CACHE_SIZE.
+        '''
+        idx = self.get_frame_id(idx)
+        if idx & GID_MASK >= len(self.tiles):
+            return None  # Not in any tileset; draw nothing.
+
+        tile = self.flipped_tiles.get(idx)
+        if tile is not None:
+            self.flipped_tiles.move_to_end(idx)
+            return tile
+
+        tile = self.tiles[idx & GID_MASK]
+        if tile is None:
+            return None
+
+        tile = transform_tile(tile, idx & FLIP_FLAGS)
+        self.flipped_tiles[idx] = tile
+        if len(self.flipped_tiles) > FLIPPED_TILE_CACHE_SIZE:
+            self.flipped_tiles.popitem(last=False)
+
+        return tile
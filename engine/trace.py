@@ -0,0 +1,241 @@
+# Engine - Frame tracing
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+''' Lightweight instrumentation to see where frame time goes.
+
+Tracing is off by default, and costs next to nothing when it's off. Turn it on
+by setting PYGAME_TRACE to an output file before running an experiment:
+
+    PYGAME_TRACE=trace.json python3 main.py
+
+A .json file is written in Chrome's trace-event format (open it with
+chrome://tracing or https://ui.perfetto.dev/), anything else is written as
+CSV. The file is written when the program exits.
+
+Wrap interesting blocks with span(), decorate interesting functions with
+traced(), and call next_frame() once per trip through the main loop.
+'''
+
+import array
+import atexit
+import csv
+import functools
+import json
+import os
+import time
+
+TRACE_ENV = 'PYGAME_TRACE'
+DEFAULT_CAPACITY = 65536  # Spans kept before the oldest are overwritten.
+
+FRAME_SPAN = 'frame'
+
+
+class TraceBuffer:
+    ''' Preallocated ring buffer of completed spans.
+
+    Spans are stored in parallel arrays so recording one doesn't allocate
+    anything; once the buffer is full, the oldest spans are overwritten.
+    '''
+    def __init__(self: 'TraceBuffer', capacity: int = DEFAULT_CAPACITY) -> None:
+        self.capacity = capacity
+
+        self.names = []  # Span names, indexed by name ID.
+        self.name_ids = {}
+
+        self.name_idx = array.array('I', bytes(4 * capacity))
+        self.frames = array.array('Q', bytes(8 * capacity))
+        self.starts = array.array('d', bytes(8 * capacity))
+        self.durations = array.array('d', bytes(8 * capacity))
+
+        self.count = 0  # Total spans recorded, including overwritten ones.
+        self.frame = 0
+        self.epoch = time.perf_counter()
+        self.frame_start = self.epoch
+        self.frame_id = self.intern(FRAME_SPAN)
+
+    def intern(self: 'TraceBuffer', name: str) -> int:
+        ''' Get the ID for a span name, adding it if it's new.
+        '''
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+        return name_id
+
+    def record(self: 'TraceBuffer', name_id: int, start: float, end: float) -> None:
+        idx = self.count % self.capacity
+        self.name_idx[idx] = name_id
+        self.frames[idx] = self.frame
+        self.starts[idx] = start - self.epoch
+        self.durations[idx] = end - start
+        self.count += 1
+
+    def next_frame(self: 'TraceBuffer') -> None:
+        now = time.perf_counter()
+        self.record(self.frame_id, self.frame_start, now)
+        self.frame_start = now
+        self.frame += 1
+
+    def events(self: 'TraceBuffer'):
+        ''' Yield (frame, name, start, duration) for each span, oldest first.
+
+        Times are in seconds; start is relative to when tracing started.
+        '''
+        first = max(0, self.count - self.capacity)
+        for i in range(first, self.count):
+            idx = i % self.capacity
+            yield self.frames[idx], self.names[self.name_idx[idx]], self.starts[idx], self.durations[idx]
+
+    def export_json(self: 'TraceBuffer', path: str) -> None:
+        ''' Write a Chrome trace-event JSON file.
+        '''
+        pid = os.getpid()
+        trace_events = []
+        for frame, name, start, duration in self.events():
+            trace_events.append({
+                'name': name,
+                'ph': 'X',  # Complete event, with a duration.
+                'ts': start * 1000000,  # Microseconds.
+                'dur': duration * 1000000,
+                'pid': pid,
+                'tid': 0,
+                'args': {'frame': frame},
+            })
+
+        with open(path, 'w') as fp:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, fp)
+
+    def export_csv(self: 'TraceBuffer', path: str) -> None:
+        ''' Write a CSV file with one span per row; times are in milliseconds.
+        '''
+        with open(path, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['frame', 'name', 'start_ms', 'duration_ms'])
+            for frame, name, start, duration in self.events():
+                writer.writerow([frame, name, f'{start * 1000:.4f}', f'{duration * 1000:.4f}'])
+
+    def export(self: 'TraceBuffer', path: str) -> None:
+        if path.lower().endswith('.json'):
+            self.export_json(path)
+        else:
+            self.export_csv(path)
+
+
+class _Span:
+    __slots__ = ('buffer', 'name_id', 'start')
+
+    def __init__(self: '_Span', buffer: TraceBuffer, name_id: int) -> None:
+        self.buffer = buffer
+        self.name_id = name_id
+        self.start = 0.0
+
+    def __enter__(self: '_Span') -> '_Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self: '_Span', *exc_info) -> bool:
+        self.buffer.record(self.name_id, self.start, time.perf_counter())
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self: '_NullSpan') -> '_NullSpan':
+        return self
+
+    def __exit__(self: '_NullSpan', *exc_info) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+_buffer = None  # The active TraceBuffer, or None if tracing is off.
+
+
+def enable(path: str = None, capacity: int = DEFAULT_CAPACITY) -> TraceBuffer:
+    ''' Start tracing; if *path* is given, the trace is written there at exit.
+
+    Functions decorated with traced() before this is called aren't traced, so
+    call it before importing the code you want to look at (setting
+    PYGAME_TRACE takes care of that for you).
+    '''
+    global _buffer
+
+    _buffer = TraceBuffer(capacity)
+    if path:
+        atexit.register(_buffer.export, path)
+
+    return _buffer
+
+
+def disable() -> None:
+    global _buffer
+
+    _buffer = None
+
+
+def is_enabled() -> bool:
+    return _buffer is not None
+
+
+def get_buffer() -> TraceBuffer:
+    return _buffer
+
+
+def span(name: str):
+    ''' Context manager that records how long its block takes.
+
+        with trace.span('lighting'):
+            draw_the_lights()
+    '''
+    if _buffer is None:
+        return _NULL_SPAN
+
+    return _Span(_buffer, _buffer.intern(name))
+
+
+def traced(name=None):
+    ''' Decorator that records how long each call takes.
+
+    Use it as @traced or @traced('name'); the default name is the function's
+    qualified name, like "Camera.draw". When tracing is off, the function is
+    returned untouched.
+    '''
+    def decorator(func):
+        buffer = _buffer
+        if buffer is None:
+            return func
+
+        name_id = buffer.intern(label or func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                buffer.record(name_id, start, time.perf_counter())
+
+        return wrapper
+
+    if callable(name):  # Used as a bare @traced
+        label = None
+        return decorator(name)
+
+    label = name
+    return decorator
+
+
+def next_frame() -> None:
+    ''' Mark the end of a frame; this records a "frame" span too.
+    '''
+    if _buffer is not None:
+        _buffer.next_frame()
+
+
+if os.environ.get(TRACE_ENV):
+    enable(os.environ[TRACE_ENV])
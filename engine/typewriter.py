@@ -0,0 +1,139 @@
+# Engine - Typewriter text
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Re-rendering a growing substring every frame rasterizes the same glyphs
+# over and over. Here each line is rendered once, and revealing another few
+# characters copies just those columns into a text surface that's kept
+# between frames. Scrolling moves that surface's pixels with Surface.scroll()
+# instead of redrawing the lines, so a long speech costs the same each frame
+# as a short one.
+
+import pygame
+import pygame.freetype
+
+from collections import deque
+
+from .text import text_cache
+
+WHITE = pygame.Color('white')
+
+TYPE_SPEED = 40  # characters per second
+SCROLL_SPEED = 120  # pixels per second
+
+
+class Typewriter:
+    ''' Lines of text that type themselves out in a *size* area.
+
+    Lines are revealed at *speed* characters per second. Once the area's
+    full, it scrolls up a line at a time at *scroll_speed* pixels per
+    second before the next line starts. Call update() every frame, and
+    draw() to show the text so far.
+    '''
+    def __init__(self: 'Typewriter', size: tuple, font: pygame.freetype.Font, color: pygame.Color = WHITE,
+                 line_height: int = None, speed: float = TYPE_SPEED, scroll_speed: float = SCROLL_SPEED) -> None:
+        self.font = font
+        self.color = color
+        self.line_height = line_height or font.get_sized_height()
+        self.speed = speed
+        self.scroll_speed = scroll_speed
+
+        self.rows = size[1] // self.line_height
+        self.surface = pygame.Surface((size[0], self.rows * self.line_height), pygame.SRCALPHA, 32)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+
+        self.pending = deque()  # Lines waiting their turn.
+        self.line = None  # Rendered Surface of the line being typed.
+        self.stops = []  # How much of the line to show after each character.
+        self.typed = 0.0  # Characters of the line shown so far.
+        self.shown = 0  # Pixels of the line shown so far.
+        self.row = 0
+        self.scroll_left = 0  # Pixels still to scroll.
+        self.scroll_credit = 0.0  # Pixels of scrolling owed; only whole ones are done.
+
+    def add_lines(self: 'Typewriter', lines: list) -> None:
+        self.pending.extend(lines)
+
+    def busy(self: 'Typewriter') -> bool:
+        return self.line is not None or self.scroll_left > 0 or len(self.pending) > 0
+
+    def start_line(self: 'Typewriter', text: str) -> None:
+        ''' Render *text* and work out where each character ends.
+        '''
+        self.line, rect = text_cache.render(self.font, text, self.color)
+        width = self.line.get_width()
+
+        # The rendered text starts at its first glyph's bearing, not at 0.
+        self.stops = []
+        pen = -rect.x
+        for metrics in self.font.get_metrics(text):
+            if metrics is not None:
+                pen += metrics[4]
+            self.stops.append(max(0, min(width, round(pen))))
+        if self.stops:
+            self.stops[-1] = width
+
+        self.typed = 0.0
+        self.shown = 0
+        if self.row >= self.rows:
+            self.row = self.rows - 1
+            self.scroll_left += self.line_height
+
+    def update(self: 'Typewriter', dt: float) -> None:
+        if self.scroll_left > 0:
+            self.scroll_credit += dt * self.scroll_speed
+            step = min(self.scroll_left, int(self.scroll_credit))
+            if step > 0:
+                self.scroll(step)
+                self.scroll_credit -= step
+            if self.scroll_left > 0:
+                return
+            self.scroll_credit = 0.0
+
+        if self.line is None:
+            if len(self.pending) == 0:
+                return
+            self.start_line(self.pending.popleft())
+            if self.scroll_left > 0:
+                return  # Make room first.
+
+        self.typed = min(len(self.stops), self.typed + dt * self.speed)
+        typed = int(self.typed)
+        self.reveal(self.stops[typed - 1] if typed > 0 else 0)
+        if typed >= len(self.stops):
+            self.line = None
+            self.row += 1
+
+    def reveal(self: 'Typewriter', width: int) -> None:
+        ''' Copy the line's columns up to *width* into the text surface.
+        '''
+        if width > self.shown:
+            # The columns haven't been drawn on yet, so MAX just copies them.
+            area = pygame.Rect(self.shown, 0, width - self.shown, self.line.get_height())
+            self.surface.blit(self.line, (self.shown, self.row * self.line_height), area, pygame.BLEND_RGBA_MAX)
+            self.shown = width
+
+    def scroll(self: 'Typewriter', pixels: int) -> None:
+        self.surface.scroll(0, -pixels)
+        height = self.surface.get_height()
+        self.surface.fill((0, 0, 0, 0), pygame.Rect(0, height - pixels, self.surface.get_width(), pixels))
+        self.scroll_left -= pixels
+
+    def finish(self: 'Typewriter') -> None:
+        ''' Show everything that's been added, right away.
+        '''
+        while self.busy():
+            self.update(3600)  # An hour's typing and scrolling is plenty.
+
+    def clear(self: 'Typewriter') -> None:
+        self.surface.fill((0, 0, 0, 0))
+        self.pending.clear()
+        self.line = None
+        self.row = 0
+        self.scroll_left = 0
+        self.scroll_credit = 0.0
+
+    def draw(self: 'Typewriter', surface: pygame.Surface, dest: tuple) -> pygame.Rect:
+        return surface.blit(self.surface, dest)
@@ -0,0 +1,88 @@
+# Engine - UI decorations
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+
+# Frame pieces in RPG_GUI_v1.png. These quads are a bit painful, the original
+# isn't set up as a texture atlas.
+RPG_GUI_FRAME = {
+    'top-left': pygame.Rect(856, 189, 24, 24),
+    'top-middle': pygame.Rect(893, 189, 73, 24),
+    'top-right': pygame.Rect(978, 189, 24, 24),
+
+    'mid-left': pygame.Rect(856, 227, 24, 55),
+    'mid-right': pygame.Rect(978, 227, 24, 55),
+
+    'bot-left': pygame.Rect(856, 294, 24, 24),
+    'bot-middle': pygame.Rect(893, 294, 73, 24),
+    'bot-right': pygame.Rect(978, 294, 24, 24),
+}
+
+
+def load_frame(ui_image: pygame.Surface, pieces: dict = RPG_GUI_FRAME) -> dict:
+    ''' Make subsurfaces for the frame *pieces* in *ui_image*.
+    '''
+    return {k: ui_image.subsurface(v) for k, v in pieces.items()}
+
+
+class Frame:
+    ''' A window frame made of corner, edge, and optional avatar decorations.
+
+    The edges are scaled to fit *rect* once, up front, and the whole thing is
+    drawn with a single blits() call.
+    '''
+    def __init__(self: 'Frame', rect: pygame.Rect, decorations: dict) -> None:
+        self.rect = rect
+        self.decorations = dict(decorations)
+        self.decoration_rects = {k: v.get_rect() for k, v in self.decorations.items()}
+        self.ui_batch = self.setup_ui_batch()
+
+    def setup_ui_batch(self: 'Frame') -> tuple:
+        decorations = self.decorations
+        rects = self.decoration_rects
+
+        middle_width = self.rect.width - rects['top-left'].width - rects['top-right'].width
+        middle_height = self.rect.height - rects['top-left'].height - rects['bot-left'].height
+
+        # Scale the middle bars to the required size; depending on the texture,
+        # this could look terrible...
+        decorations['top-middle'] = pygame.transform.smoothscale(decorations['top-middle'],
+                                                                 (middle_width, rects['top-middle'].height))
+        decorations['bot-middle'] = pygame.transform.smoothscale(decorations['bot-middle'],
+                                                                 (middle_width, rects['bot-middle'].height))
+        decorations['mid-left'] = pygame.transform.smoothscale(decorations['mid-left'],
+                                                               (rects['mid-left'].width, middle_height))
+        decorations['mid-right'] = pygame.transform.smoothscale(decorations['mid-right'],
+                                                                (rects['mid-right'].width, middle_height))
+        for k in ('top-middle', 'bot-middle', 'mid-left', 'mid-right'):
+            rects[k] = decorations[k].get_rect()
+
+        # Position all the rects.
+        rects['top-left'].topleft = self.rect.topleft
+        rects['top-middle'].topleft = rects['top-left'].topright
+        rects['top-right'].topleft = rects['top-middle'].topright
+        rects['mid-left'].topleft = rects['top-left'].bottomleft
+        rects['mid-right'].topleft = rects['top-right'].bottomleft
+        rects['bot-left'].topleft = rects['mid-left'].bottomleft
+        rects['bot-middle'].topleft = rects['bot-left'].topright
+        rects['bot-right'].topleft = rects['bot-middle'].topright
+        if 'avatar' in rects:
+            rects['avatar'].topleft = rects['top-left'].bottomright
+
+        order = ['top-left', 'top-middle', 'top-right', 'mid-left', 'mid-right', 'bot-left', 'bot-middle', 'bot-right']
+        if 'avatar' in decorations:
+            order.append('avatar')
+
+        return tuple((decorations[k], rects[k]) for k in order)
+
+    def get_inner_rect(self: 'Frame') -> pygame.Rect:
+        ''' The area inside the frame's edges.
+        '''
+        rects = self.decoration_rects
+        return pygame.Rect(rects['top-left'].right, rects['top-left'].bottom, rects['top-middle'].width,
+                           rects['mid-left'].height)
+
+    def draw(self: 'Frame', surface: pygame.Surface) -> None:
+        surface.blits(self.ui_batch, doreturn=False)
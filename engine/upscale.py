@@ -0,0 +1,77 @@
+# Engine - Render at native resolution, then upscale
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+#
+# Scaling every tile (or chunk) costs more the more there is on screen;
+# drawing the whole scene at its native, low resolution and scaling the
+# finished frame once costs the same no matter what's in it.
+
+import pygame
+
+
+def choose_scaler(native_size: tuple, output_size: tuple) -> callable:
+    ''' Pick a pygame.transform function for scaling *native_size* frames to
+    *output_size*.
+
+    Exactly 2x gets scale2x(), other whole-number ratios get scale() so
+    pixels stay square and sharp, and anything else gets smoothscale() to
+    hide the uneven pixel sizes.
+    '''
+    ratio_x = output_size[0] / native_size[0]
+    ratio_y = output_size[1] / native_size[1]
+    if ratio_x != ratio_y or ratio_x != int(ratio_x):
+        return pygame.transform.smoothscale
+    elif ratio_x == 2:
+        return pygame.transform.scale2x
+
+    return pygame.transform.scale
+
+
+class Upscaler:
+    ''' An offscreen native-resolution *surface* that's scaled to fit the
+    *window* once per frame by present().
+
+    The frame keeps its aspect ratio; any leftover space in the window is
+    black. With *whole* set, frames are only scaled by whole numbers (unless
+    the window's too small for even that). *scaler* overrides
+    choose_scaler().
+    '''
+    def __init__(self: 'Upscaler', native_size: tuple, window: pygame.Surface, whole: bool = True,
+                 scaler: callable = None) -> None:
+        self.surface = pygame.Surface(native_size).convert()
+        self.whole = whole
+        self.fixed_scaler = scaler
+        self.resize(window)
+
+    def resize(self: 'Upscaler', window: pygame.Surface) -> None:
+        ''' Fit the frame to a new (or resized) *window*.
+        '''
+        self.window = window
+
+        native_w, native_h = self.surface.get_size()
+        ratio = min(window.get_width() / native_w, window.get_height() / native_h)
+        if self.whole and ratio >= 1:
+            ratio = int(ratio)  # Sharp, square pixels; the rest is border.
+
+        self.rect = pygame.Rect(0, 0, round(native_w * ratio), round(native_h * ratio))
+        self.rect.center = window.get_rect().center
+        self.scaler = self.fixed_scaler or choose_scaler(self.surface.get_size(), self.rect.size)
+
+        # Scaling straight into the window saves allocating a frame each time.
+        window.fill((0, 0, 0))
+        self.target = window.subsurface(self.rect)
+
+    def present(self: 'Upscaler') -> None:
+        ''' Scale the finished frame into the window.
+        '''
+        if self.scaler == pygame.transform.scale2x:
+            pygame.transform.scale2x(self.surface, self.target)
+        else:
+            self.scaler(self.surface, self.rect.size, self.target)
+
+    def to_native(self: 'Upscaler', pos: tuple) -> tuple:
+        ''' Convert a window position (the mouse, say) to native pixels.
+        '''
+        return ((pos[0] - self.rect.x) * self.surface.get_width() // self.rect.width,
+                (pos[1] - self.rect.y) * self.surface.get_height() // self.rect.height)
@@ -0,0 +1,116 @@
+# Tests - Shared fixtures
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+import pygame  # noqa: E402
+import pytest  # noqa: E402
+
+# The shared engine package lives at the top of the repo.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from engine import Map  # noqa: E402
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '22-fancy-text', 'resources',
+                         'LiberationSerif-Bold.ttf')
+
+TILE_SIZE = 4
+OPAQUE = pygame.Color(10, 10, 10, 255)
+HALF_ALPHA = pygame.Color(200, 100, 50, 128)
+UNUSED = pygame.Color(255, 0, 0, 255)  # Tile 3 is in the tileset, but not the map.
+
+MAP_TMX = '''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.5" orientation="orthogonal" width="4" height="4" tilewidth="{0}" tileheight="{0}">
+ <tileset firstgid="1" source="tiles.tsx"/>
+ <layer id="1" name="ground" width="4" height="4">
+  <data encoding="csv">
+1,1,1,1,
+1,1,1,1,
+1,1,1,1,
+1,1,1,1
+</data>
+ </layer>
+ <layer id="2" name="top" width="4" height="4">
+  <data encoding="csv">
+2,0,2,0,
+0,2,0,2,
+2,2,0,0,
+0,0,2,2
+</data>
+ </layer>
+</map>
+'''.format(TILE_SIZE)
+
+TILES_TSX = '''<?xml version="1.0" encoding="UTF-8"?>
+<tileset version="1.5" name="tiles" tilewidth="{0}" tileheight="{0}" tilecount="3" columns="3">
+ <image source="tiles.png" width="{1}" height="{0}"/>
+{2}</tileset>
+'''
+
+# Tile 3 flips to tile 1 and back every 100ms.
+ANIMATION = ''' <tile id="2">
+  <animation>
+   <frame tileid="2" duration="100"/>
+   <frame tileid="0" duration="100"/>
+  </animation>
+ </tile>
+'''
+
+
+@pytest.fixture(scope='session')
+def screen() -> pygame.Surface:
+    pygame.init()
+    screen = pygame.display.set_mode((64, 64))
+    yield screen
+    pygame.quit()
+
+
+def write_map(directory: str, animations: str = '') -> str:
+    tiles = pygame.Surface((TILE_SIZE * 3, TILE_SIZE), pygame.SRCALPHA, 32)
+    for i, color in enumerate((OPAQUE, HALF_ALPHA, UNUSED)):
+        tiles.fill(color, pygame.Rect(i * TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
+    pygame.image.save(tiles, str(directory / 'tiles.png'))
+
+    (directory / 'tiles.tsx').write_text(TILES_TSX.format(TILE_SIZE, TILE_SIZE * 3, animations))
+    (directory / 'map.tmx').write_text(MAP_TMX)
+
+    return str(directory / 'map.tmx')
+
+
+@pytest.fixture
+def layered_map(screen: pygame.Surface, tmp_path: str) -> str:
+    ''' Path to a 4x4 map with an opaque "ground" layer and a half-alpha
+    "top" layer over some of it.
+    '''
+    return write_map(tmp_path)
+
+
+@pytest.fixture
+def animated_map(screen: pygame.Surface, tmp_path: str) -> str:
+    ''' The same map, but tile 3 (not in the map) is animated.
+    '''
+    return write_map(tmp_path, ANIMATION)
+
+
+def draw_layers(the_map: Map, layers: list, background: pygame.Color) -> pygame.Surface:
+    ''' Draw *layers* one by one, the slow way, over *background*.
+    '''
+    size = (the_map.map_width * the_map.tile_width, the_map.map_height * the_map.tile_height)
+    expected = pygame.Surface(size).convert()
+    expected.fill(background)
+    for layer in layers:
+        the_map.render(layer, expected, pygame.Rect(0, 0, the_map.map_width, the_map.map_height))
+
+    return expected
+
+
+def assert_same(actual: pygame.Surface, expected: pygame.Surface) -> None:
+    for y in range(expected.get_height()):
+        for x in range(expected.get_width()):
+            assert actual.get_at((x, y)) == expected.get_at((x, y)), (x, y)
@@ -0,0 +1,21 @@
+# Tests - Bitmap fonts
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import pygame.freetype
+import pytest
+
+from conftest import FONT_PATH
+from engine import BitmapFont
+
+
+@pytest.mark.parametrize('kerning', [False, True])
+def test_get_kerning_leaves_font_alone(screen: pygame.Surface, kerning: bool) -> None:
+    font = pygame.freetype.Font(FONT_PATH, 16)
+    font.kerning = kerning
+    bitmap_font = BitmapFont(font)
+
+    bitmap_font.get_kerning('A', 'V')
+    assert font.kerning == kerning
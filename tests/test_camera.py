@@ -0,0 +1,50 @@
+# Tests - Camera zoom levels
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import pytest
+
+from conftest import assert_same, draw_layers, OPAQUE, UNUSED
+from engine import Camera, Map
+from engine.camera import ZoomLevel
+
+
+def draw_chunks(level: ZoomLevel, layer: str, background: pygame.Color) -> pygame.Surface:
+    surface = draw_layers(level.map, [], background)
+    span_x = level.chunk_span(0, surface.get_width(), level.map.tile_width)
+    span_y = level.chunk_span(0, surface.get_height(), level.map.tile_height)
+    surface.blits([(level.get_chunk(layer, cx, cy, 0), level.chunk_rect(cx, cy), None, pygame.BLEND_PREMULTIPLIED)
+                   for cy in span_y for cx in span_x], doreturn=False)
+
+    return surface
+
+
+@pytest.mark.parametrize('redraw', [False, True])
+def test_half_alpha_chunks_match_layer_blits(layered_map: str, redraw: bool) -> None:
+    the_map = Map(layered_map)
+    level = ZoomLevel(the_map, 1.0, pygame.transform.scale)
+    level.chunk_size = 2
+    draw_chunks(level, 'top', OPAQUE)  # Build and cache the chunks.
+    if redraw:
+        for y in range(the_map.map_height):
+            for x in range(the_map.map_width):
+                level.redraw_cell('top', x, y)
+
+    assert_same(draw_chunks(level, 'top', OPAQUE), draw_layers(the_map, ['top'], OPAQUE))
+
+
+def test_animated_edge_when_zoomed(screen: pygame.Surface, animated_map: str) -> None:
+    camera = Camera(screen, Map(animated_map))
+    camera.set_viewport(screen.get_rect())
+    camera.set_edge(3)
+    camera.set_scale(2)
+
+    corner = (0, 0)  # The camera's on the map's top-left tile, so this is outside.
+    for color in (UNUSED, OPAQUE, UNUSED):
+        screen.fill((0, 0, 0))
+        camera.draw('ground')
+        assert screen.get_at(corner) == color
+
+        camera.update(0.1)
@@ -0,0 +1,36 @@
+# Tests - Tile layer compositor
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import pytest
+
+from conftest import assert_same, draw_layers, OPAQUE
+from engine import LayerCompositor, Map
+
+
+def composite(compositor: LayerCompositor, the_map: Map, background: pygame.Color) -> pygame.Surface:
+    surface = draw_layers(the_map, [], background)
+    compositor.render(surface, pygame.Rect(0, 0, the_map.map_width, the_map.map_height))
+
+    return surface
+
+
+@pytest.mark.parametrize('layers', [['ground', 'top'], ['top']])
+def test_half_alpha_matches_layer_blits(layered_map: str, layers: list) -> None:
+    the_map = Map(layered_map)
+    compositor = LayerCompositor(the_map, layers, chunk_size=2)
+
+    assert_same(composite(compositor, the_map, OPAQUE), draw_layers(the_map, layers, OPAQUE))
+
+
+def test_redrawn_cell_matches_layer_blits(layered_map: str) -> None:
+    the_map = Map(layered_map)
+    compositor = LayerCompositor(the_map, ['ground', 'top'], chunk_size=2)
+    _, chunks = compositor.groups[0]
+    for y in range(the_map.map_height):
+        for x in range(the_map.map_width):
+            compositor.redraw_cell(['ground', 'top'], chunks, x, y)
+
+    assert_same(composite(compositor, the_map, OPAQUE), draw_layers(the_map, ['ground', 'top'], OPAQUE))
@@ -0,0 +1,129 @@
+# Tests - Keyword conversations
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import json
+import os
+import pytest
+
+from engine import Conversation, load_dialogue
+from engine import dialogue
+
+GUARD = {
+    'name': 'Guard',
+    'greeting': 'Halt!',
+    'topics': {
+        'name': 'I am the guard.',
+        'job': {'text': 'I guard the GATE and the GARDEN.', 'topics': {'gate': 'It stays shut.', 'garden': 'Roses.'}},
+        'jobs': 'Just the one.',
+    },
+}
+
+
+def write_dialogue(directory: str, name: str, data: dict) -> str:
+    path = os.path.join(directory, name + '.json')
+    with open(path, 'w', encoding='utf-8') as dialogue_file:
+        json.dump(data, dialogue_file)
+
+    return path
+
+
+@pytest.fixture
+def compiled(monkeypatch: pytest.MonkeyPatch) -> list:
+    ''' Paths passed to compile_script(), in order.
+    '''
+    paths = []
+    compile_script = dialogue.compile_script
+
+    def counting_compile(path: str) -> dialogue.Script:
+        paths.append(os.path.basename(path))
+        return compile_script(path)
+
+    monkeypatch.setattr(dialogue, 'compile_script', counting_compile)
+
+    return paths
+
+
+def test_find(tmp_path: str) -> None:
+    write_dialogue(tmp_path, 'guard', GUARD)
+    script = load_dialogue(tmp_path, cache=False)['guard']
+
+    assert script.find('GA') == ['GARDEN', 'GATE']
+    assert script.find('JOB') == ['JOB', 'JOBS']
+    assert script.find('') == script.keywords
+    assert script.find('X') == []
+
+
+def test_conversation(tmp_path: str) -> None:
+    write_dialogue(tmp_path, 'guard', GUARD)
+    conversation = Conversation(load_dialogue(tmp_path, cache=False)['guard'])
+
+    assert conversation.match('na') == 'NAME'  # Unique prefix.
+    assert conversation.match('job') == 'JOB'  # Exact beats longer matches.
+    assert conversation.match('jo') is None  # JOB or JOBS?
+    assert conversation.match('') is None
+    assert conversation.complete('jo') == ['JOB', 'JOBS']
+
+    # GATE's locked until the guard mentions it.
+    assert conversation.ask('gate') == "I don't know anything about gate."
+    assert conversation.complete('ga') == []
+    assert conversation.ask(' Job ') == GUARD['topics']['job']['text']
+    assert conversation.complete('ga') == ['GARDEN', 'GATE']
+    assert conversation.ask('gat') == 'It stays shut.'
+
+
+def test_bad_dialogue(tmp_path: str) -> None:
+    write_dialogue(tmp_path, 'broken', {'name': 'Nobody'})
+    with pytest.raises(ValueError):
+        load_dialogue(tmp_path, cache=False)
+
+
+def test_cache_reuse(tmp_path: str, compiled: list) -> None:
+    write_dialogue(tmp_path, 'guard', GUARD)
+    write_dialogue(tmp_path, 'other', dict(GUARD, name='Other'))
+
+    assert load_dialogue(tmp_path)['guard'].name == 'Guard'
+    assert compiled == ['guard.json', 'other.json']
+    assert os.path.exists(os.path.join(tmp_path, '__pycache__', dialogue.DIALOGUE_CACHE))
+
+    scripts = load_dialogue(tmp_path)
+    assert compiled == ['guard.json', 'other.json']  # Nothing changed, nothing compiled.
+    assert sorted(scripts) == ['guard', 'other']
+    assert Conversation(scripts['other']).ask('name') == 'I am the guard.'
+
+
+def test_cache_invalidation(tmp_path: str, compiled: list) -> None:
+    path = write_dialogue(tmp_path, 'guard', GUARD)
+    write_dialogue(tmp_path, 'other', GUARD)
+    load_dialogue(tmp_path)
+    del compiled[:]
+
+    # A different size.
+    write_dialogue(tmp_path, 'guard', dict(GUARD, greeting='Who goes there?'))
+    assert load_dialogue(tmp_path)['guard'].greeting == 'Who goes there?'
+    assert compiled == ['guard.json']
+
+    # Same size, new mtime.
+    write_dialogue(tmp_path, 'guard', dict(GUARD, greeting='Who goes THERE?'))
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 1000000000))
+    assert load_dialogue(tmp_path)['guard'].greeting == 'Who goes THERE?'
+    assert compiled == ['guard.json', 'guard.json']
+
+    # Removed files are dropped from the cache too.
+    os.remove(path)
+    assert list(load_dialogue(tmp_path)) == ['other']
+    assert list(load_dialogue(tmp_path)) == ['other']
+    assert compiled == ['guard.json', 'guard.json']
+
+
+def test_broken_cache(tmp_path: str, compiled: list) -> None:
+    write_dialogue(tmp_path, 'guard', GUARD)
+    os.makedirs(os.path.join(tmp_path, '__pycache__'))
+    with open(os.path.join(tmp_path, '__pycache__', dialogue.DIALOGUE_CACHE), 'wb') as cache_file:
+        cache_file.write(b'not a pickle')
+
+    assert load_dialogue(tmp_path)['guard'].name == 'Guard'
+    load_dialogue(tmp_path)
+    assert compiled == ['guard.json']  # Rebuilt once, then reused.
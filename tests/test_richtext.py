@@ -0,0 +1,30 @@
+# Tests - Text with inline markup
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import pygame.freetype
+
+from engine import parse_markup
+
+NORMAL = pygame.freetype.STYLE_NORMAL
+RED = pygame.Color('#ff0000')
+WHITE = pygame.Color('white')
+
+
+def test_color_tags() -> None:
+    assert parse_markup('a {color=#ff0000}b{/color} c') == [
+        ('a ', NORMAL, WHITE, None),
+        ('b', NORMAL, RED, None),
+        (' c', NORMAL, WHITE, None),
+    ]
+
+
+def test_bad_color_is_text() -> None:
+    assert parse_markup('a {color=nope}b{/color} c') == [('a {color=nope}b{/color} c', NORMAL, WHITE, None)]
+    assert parse_markup('{bg=#12345z}b{/bg}') == [('{bg=#12345z}b{/bg}', NORMAL, WHITE, None)]
+
+
+def test_unknown_tags_are_text() -> None:
+    assert parse_markup('{b}x{/s}{color}') == [('{b}x{/s}{color}', NORMAL, WHITE, None)]
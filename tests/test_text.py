@@ -0,0 +1,78 @@
+# Tests - Cached text rendering
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import pygame.freetype
+import pytest
+
+from conftest import FONT_PATH
+from engine import OUTLINE, TextCache, wrap_text
+
+WHITE = pygame.Color('white')
+
+TEXT = ('The quick brown fox jumps over the lazy dog; meanwhile, a '
+        'supercalifragilisticexpialidocious word sits here and the story goes on for a while longer.')
+
+
+@pytest.mark.parametrize('origin', [False, True])
+def test_render_to_matches_font(screen: pygame.Surface, origin: bool) -> None:
+    font = pygame.freetype.Font(FONT_PATH, 16)
+    font.origin = origin
+    cache = TextCache()
+
+    expected = font.render_to(pygame.Surface((200, 50)), (10, 30), 'Baseline gjy', WHITE)
+    assert cache.render_to(pygame.Surface((200, 50)), (10, 30), font, 'Baseline gjy', WHITE) == expected
+
+    # The effect's one pixel bigger all around.
+    drawn = cache.render_effect_to(pygame.Surface((200, 50)), (10, 30), font, 'Baseline gjy', WHITE, OUTLINE)
+    assert drawn == expected.inflate(2, 2)
+
+
+
+def line_width(font: pygame.freetype.Font, line: str) -> int:
+    ''' How wide wrap_text() considers *line*: its words plus the spaces
+    between them, measured from scratch.
+    '''
+    words = line.split()
+    return sum(font.get_rect(word).width for word in words) + font.get_rect(' ').width * (len(words) - 1)
+
+
+def test_wrap_text_fits(screen: pygame.Surface) -> None:
+    font = pygame.freetype.Font(FONT_PATH, 16)
+    lines = wrap_text(font, TEXT, 150)
+
+    assert len(lines) > 1
+    assert ' '.join(lines).split() == TEXT.split()
+    for line in lines:
+        # Only a word that's too long on its own gets to overflow.
+        assert line_width(font, line) < 150 or ' ' not in line
+    assert 'supercalifragilisticexpialidocious' in lines
+
+
+def test_wrap_text_fills_lines(screen: pygame.Surface) -> None:
+    font = pygame.freetype.Font(FONT_PATH, 16)
+    lines = wrap_text(font, TEXT, 150)
+
+    # Each line is as long as it can be; its next word wouldn't have fit.
+    for line, next_line in zip(lines, lines[1:]):
+        assert line_width(font, line + ' ' + next_line.split()[0]) >= 150
+
+
+def test_wrap_text_short(screen: pygame.Surface) -> None:
+    font = pygame.freetype.Font(FONT_PATH, 16)
+    assert wrap_text(font, 'Fits  fine.', 500) == ['Fits  fine.']  # Untouched, spaces and all.
+    assert wrap_text(font, 'Word', 1) == ['Word']
+    assert wrap_text(font, '', 100) == ['']
+
+
+def test_wrap_text_size_change(screen: pygame.Surface) -> None:
+    font = pygame.freetype.Font(FONT_PATH, 16)
+    small = wrap_text(font, TEXT, 300)
+    font.size = 32  # The remembered word widths are for 16 points.
+    big = wrap_text(font, TEXT, 300)
+
+    assert len(big) > len(small)
+    for line in big:
+        assert line_width(font, line) < 300 or ' ' not in line
@@ -0,0 +1,83 @@
+# Tests - Text entry
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pytest
+import random
+
+from engine import GapBuffer
+
+
+def check(buffer: GapBuffer, text: str) -> None:
+    ''' *buffer* holds *text*, and looks it up the same way str does.
+    '''
+    assert str(buffer) == text
+    assert len(buffer) == len(text)
+    for start in range(len(text) + 1):
+        assert buffer.slice(start, len(text)) == text[start:]
+        assert buffer.slice(0, start) == text[:start]
+        assert buffer.find('\n', start) == text.find('\n', start)
+        assert buffer.rfind('\n', start) == text.rfind('\n', 0, start)
+        if start < len(text):
+            assert buffer[start] == text[start]
+            assert buffer[start - len(text)] == text[start]
+
+
+def test_empty() -> None:
+    buffer = GapBuffer()
+    check(buffer, '')
+    with pytest.raises(IndexError):
+        buffer[0]
+
+    buffer.delete_before(5)
+    buffer.delete_after(5)
+    check(buffer, '')
+
+
+def test_edits() -> None:
+    buffer = GapBuffer('hello world', gap=2)
+    buffer.move(5)
+    buffer.insert(',\nbig')  # Bigger than the gap.
+    check(buffer, 'hello,\nbig world')
+
+    buffer.move(0)
+    buffer.delete_after(7)
+    check(buffer, 'big world')
+
+    buffer.move(100)  # Clamped to the end.
+    buffer.delete_before(6)
+    buffer.insert('!\n')
+    check(buffer, 'big!\n')
+
+
+def test_random_edits() -> None:
+    rng = random.Random(0)
+    buffer = GapBuffer(gap=4)
+    text = ''
+    cursor = 0
+    for _ in range(500):
+        action = rng.randrange(4)
+        if action == 0:
+            cursor = rng.randint(0, len(text))
+            buffer.move(cursor)
+        elif action == 1:
+            piece = ''.join(rng.choice('ab\n') for _ in range(rng.randint(1, 6)))
+            buffer.insert(piece)
+            text = text[:cursor] + piece + text[cursor:]
+            cursor += len(piece)
+        elif action == 2:
+            count = rng.randint(1, 3)
+            buffer.delete_before(count)
+            text = text[:max(0, cursor - count)] + text[cursor:]
+            cursor = max(0, cursor - count)
+        else:
+            count = rng.randint(1, 3)
+            buffer.delete_after(count)
+            text = text[:cursor] + text[cursor + count:]
+
+        assert buffer.gap_start == cursor
+        if rng.randrange(10) == 0:
+            check(buffer, text)
+
+    check(buffer, text)
@@ -0,0 +1,50 @@
+# Tests - Tiled map loader
+#
+# By Chris Herborth (https://github.com/Taffer)
+# MIT license, see LICENSE.md for details.
+
+import pygame
+import pytest
+
+from conftest import UNUSED
+from engine import Camera, Map
+from engine.assets import assets
+from engine.tilemap import FLIPPED_DIAGONALLY, FLIPPED_HORIZONTALLY, FLIPPED_VERTICALLY
+
+
+def test_packed_maps_share_tileset_image(layered_map: str) -> None:
+    Map(layered_map, pack=True)
+    loads = assets.loads
+    Map(layered_map, pack=True)
+    Map(layered_map)
+
+    assert assets.loads == loads
+
+
+def test_pack_keeps_extra_tiles(layered_map: str) -> None:
+    the_map = Map(layered_map, pack=True)
+    assert the_map.tile_id(3) == 0
+
+    the_map = Map(layered_map, pack=True, keep=(3,))
+    assert the_map.get_tile_texture(the_map.tile_id(3)).get_at((0, 0)) == UNUSED
+
+
+def test_edge_must_be_packed(screen: pygame.Surface, layered_map: str) -> None:
+    camera = Camera(screen, Map(layered_map, pack=True))
+    with pytest.raises(ValueError):
+        camera.set_edge(3)
+    camera.set_edge(0)  # No edge is fine.
+
+    camera = Camera(screen, Map(layered_map, pack=True, keep=(3,)))
+    camera.set_edge(3)
+
+
+@pytest.mark.parametrize('pack', [False, True])
+def test_unknown_tiles_draw_nothing(layered_map: str, pack: bool) -> None:
+    the_map = Map(layered_map, pack=pack)
+    for gid in (99, 99 | FLIPPED_HORIZONTALLY, 99 | FLIPPED_DIAGONALLY):
+        assert the_map.get_frame_id(gid) == gid
+        assert the_map.get_tile_texture(gid) is None
+
+    the_map.layer_data['top'][0] = 99 | FLIPPED_VERTICALLY
+    the_map.render('top', pygame.Surface((16, 16)), pygame.Rect(0, 0, 4, 4))